@@ -0,0 +1,170 @@
+# analytics.py
+import calendar
+import os
+import sqlite3
+from datetime import date
+from typing import Dict, Iterable, Optional
+from urllib.request import pathname2url
+
+import numpy as np
+import pandas as pd
+
+import database
+from archive import archive_path, archived_years
+
+ROLLING_WINDOWS = (3, 6, 12)
+
+def _connections(include_archives: bool, users: tuple = ()):
+    # In tenant mode only the files of the requested users are read
+    # (the directory database has empty data tables, so a result is always produced)
+    hot = database.data_paths(list(users) or None) or [database.DB_NAME]
+    paths = list(hot)
+    if include_archives:
+        for db_path in hot:
+            paths += [p for p in (archive_path(y, db_path) for y in archived_years(db_path)) if os.path.exists(p)]
+    for p in paths:
+        if p in hot:
+            yield sqlite3.connect(p)
+        else:
+            yield sqlite3.connect("file:" + pathname2url(p) + "?mode=ro", uri=True)
+
+def _user_filter(user_ids: Optional[Iterable[int]]):
+    if user_ids is None:
+        return "", ()
+    ids = tuple(user_ids)
+    return f" AND user_id IN ({','.join('?' * len(ids))})", ids
+
+def _read_sql(sql: str, params: tuple, include_archives: bool = False, users: tuple = ()) -> pd.DataFrame:
+    frames = []
+    for conn in _connections(include_archives, users):
+        try:
+            frames.append(pd.read_sql_query(sql, conn, params=params))
+        finally:
+            conn.close()
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+# ---------- Aggregates ----------
+def monthly_category_totals(user_ids: Optional[Iterable[int]] = None, include_archives: bool = True) -> pd.DataFrame:
+    """One row per (user_id, category, month) with the month's total; aggregated in SQL."""
+    where, params = _user_filter(user_ids)
+    df = _read_sql(
+        "SELECT user_id, category, substr(date, 1, 7) AS month, SUM(amount) AS total "
+        f"FROM expenses WHERE 1=1{where} GROUP BY user_id, category, month",
+        params, include_archives, users=params
+    )
+    # Archives and late hot rows can hold the same month
+    return df.groupby(["user_id", "category", "month"], as_index=False)["total"].sum()
+
+def rolling_averages(monthly: pd.DataFrame, windows=ROLLING_WINDOWS) -> pd.DataFrame:
+    """
+    Rolling mean of monthly spend per (user_id, category) for each window.
+    Each series starts at its own first month with spending and runs to the
+    latest month overall; months without spending count as 0 and the first
+    months average what exists. All series are computed at once on a dense
+    (series x month) grid.
+    """
+    if monthly.empty:
+        return pd.DataFrame(columns=["user_id", "category", "month", "total", *[f"avg_{w}m" for w in windows]])
+    # Months as ordinals (year * 12 + month - 1); parsing Periods row by row is far slower
+    month_str = monthly["month"].str
+    ordinal = (month_str[:4].astype(int) * 12 + month_str[5:7].astype(int) - 1).to_numpy()
+    first, last = ordinal.min(), ordinal.max()
+    all_months = np.array([f"{o // 12:04d}-{o % 12 + 1:02d}" for o in range(first, last + 1)])
+    series_keys = pd.MultiIndex.from_frame(monthly[["user_id", "category"]]).unique()
+    row = series_keys.get_indexer(pd.MultiIndex.from_frame(monthly[["user_id", "category"]]))
+    col = ordinal - first
+
+    grid = np.zeros((len(series_keys), len(all_months)))
+    grid[row, col] = monthly["total"].to_numpy()
+    csum = np.concatenate([np.zeros((grid.shape[0], 1)), np.cumsum(grid, axis=1)], axis=1)
+    start = np.full(len(series_keys), len(all_months))
+    np.minimum.at(start, row, col)
+    # Months since the series started (1 = its first month); cells before that are dropped
+    t = np.arange(1, len(all_months) + 1)
+    age = t - start[:, None]
+    keep = (age > 0).ravel()
+
+    out = {
+        "user_id": np.repeat(series_keys.get_level_values(0).to_numpy(), len(all_months))[keep],
+        "category": np.repeat(series_keys.get_level_values(1).to_numpy(), len(all_months))[keep],
+        "month": np.tile(all_months, len(series_keys))[keep],
+        "total": grid.ravel()[keep],
+    }
+    for w in windows:
+        n = np.clip(age, 1, w)
+        out[f"avg_{w}m"] = ((csum[:, t] - np.take_along_axis(csum, t - n, axis=1)) / n).ravel()[keep]
+    return pd.DataFrame(out)
+
+# ---------- Forecast ----------
+def month_end_forecast(user_ids: Optional[Iterable[int]] = None, today: Optional[date] = None) -> pd.DataFrame:
+    """
+    Projected month-end spend per user. The daily rate for the rest of the month
+    blends this month's pace with the trailing 3-complete-month average, weighted
+    by how much of the month has elapsed. Joined with budgets for early warnings.
+    """
+    today = today or date.today()
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    month_start = today.replace(day=1)
+    hist_start = (pd.Period(today, freq="M") - 3).start_time.date()
+    where, params = _user_filter(user_ids)
+
+    spent = _read_sql(
+        "SELECT user_id, SUM(amount) AS spent FROM expenses "
+        f"WHERE date BETWEEN ? AND ?{where} GROUP BY user_id",
+        (month_start.isoformat(), today.isoformat(), *params), users=params
+    )
+    hist = _read_sql(
+        "SELECT user_id, SUM(amount) / 3.0 AS baseline FROM expenses "
+        f"WHERE date >= ? AND date < ?{where} GROUP BY user_id",
+        (hist_start.isoformat(), month_start.isoformat(), *params),
+        include_archives=today.month <= 3, users=params
+    ).groupby("user_id", as_index=False)["baseline"].sum()
+    budgets = _read_sql(f"SELECT user_id, monthly_budget AS budget FROM budgets WHERE 1=1{where}", params, users=params)
+
+    df = spent.merge(hist, on="user_id", how="outer").merge(budgets, on="user_id", how="left")
+    df[["spent", "baseline"]] = df[["spent", "baseline"]].fillna(0.0)
+    elapsed = today.day
+    weight = elapsed / days_in_month
+    pace_rate = df["spent"].to_numpy() / elapsed
+    hist_rate = df["baseline"].to_numpy() / days_in_month
+    rate = np.where(df["baseline"].to_numpy() > 0, weight * pace_rate + (1 - weight) * hist_rate, pace_rate)
+    df["forecast"] = df["spent"] + rate * (days_in_month - elapsed)
+    budget = df["budget"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["forecast_pct"] = np.where(budget > 0, df["forecast"].to_numpy() / budget * 100, np.nan)
+    df["over_budget"] = df["forecast_pct"] > 100
+    return df[["user_id", "spent", "baseline", "forecast", "budget", "forecast_pct", "over_budget"]]
+
+# ---------- Outliers ----------
+def detect_outliers(user_ids: Optional[Iterable[int]] = None, threshold: float = 3.5,
+                    min_samples: int = 8, include_archives: bool = True) -> pd.DataFrame:
+    """
+    Flag unusually large expenses with a robust z-score (median / MAD) computed
+    per (user_id, category) over the same history as monthly_category_totals
+    (archived years included by default). Groups with fewer than min_samples
+    expenses are skipped.
+    """
+    where, params = _user_filter(user_ids)
+    df = _read_sql(f"SELECT id, user_id, date, category, amount FROM expenses WHERE 1=1{where}", params,
+                   include_archives, users=params)
+    if df.empty:
+        return df.assign(score=pd.Series(dtype=float))
+    g = df.groupby(["user_id", "category"])["amount"]
+    median = g.transform("median")
+    mad = (df["amount"] - median).abs().groupby([df["user_id"], df["category"]]).transform("median")
+    count = g.transform("size")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = 0.6745 * (df["amount"] - median) / mad
+    df["score"] = score.where(mad > 0)
+    flagged = df[(count >= min_samples) & (df["score"] > threshold)]
+    return flagged.sort_values("score", ascending=False).reset_index(drop=True)
+
+# ---------- Batch ----------
+def run_nightly(today: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+    """All analytics for every user in one pass over the aggregates."""
+    monthly = monthly_category_totals()
+    return {
+        "rolling": rolling_averages(monthly),
+        "forecast": month_end_forecast(today=today),
+        "outliers": detect_outliers(),
+    }
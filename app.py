@@ -1,6 +1,7 @@
 # app.py
 import os
 from datetime import datetime, date
+import numpy as np
 import pandas as pd
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib.pagesizes import A4
@@ -9,34 +10,98 @@ from reportlab.lib.styles import getSampleStyleSheet
 
 from PyQt6.QtWidgets import (
     QWidget, QLabel, QPushButton, QLineEdit, QComboBox, QDateEdit,
-    QTableWidget, QVBoxLayout, QHBoxLayout, QMessageBox, QTableWidgetItem,
-    QHeaderView, QProgressBar, QInputDialog, QFileDialog, QDialog, QFormLayout
+    QTableWidget, QTableView, QVBoxLayout, QHBoxLayout, QMessageBox, QTableWidgetItem,
+    QHeaderView, QProgressBar, QInputDialog, QFileDialog, QDialog, QFormLayout, QApplication
+)
+from PyQt6.QtCore import QAbstractTableModel, QDate, QModelIndex, Qt, QTimer
+from PyQt6.QtCharts import (
+    QChart, QChartView, QPieSeries, QBarSeries, QBarSet, QLineSeries, QBarCategoryAxis, QValueAxis
 )
-from PyQt6.QtCore import QDate, Qt
-from PyQt6.QtCharts import QChart, QChartView, QPieSeries
 from PyQt6.QtGui import QPainter
 
 from database import (
-    fetch_expenses, add_expense_to_db, delete_expense_from_db,
     get_monthly_budget, set_budget,
     fetch_incomes, add_income, delete_income,
     fetch_recurring_expenses, add_recurring_expense, delete_recurring_expense,
-    backup_db, restore_db
+    backup_db, restore_db, db_path_for, cached_for_user
 )
+from expense_store import ExpenseStore
+from archive import archived_years_in_range, fetch_all_expenses, fetch_expenses_range
+from analytics import month_end_forecast
+from profiler import phase, profiled
+from maintenance import is_due, start_background_maintenance
+from cashflow import cash_flow
 
 CATEGORIES = ["Food", "Transportation", "Rent", "Shopping", "Entertainment", "Bills", "Other"]
 
+# Idle-time DB maintenance: checked shortly after start, then every MAINTENANCE_CHECK_MS;
+# a due pass runs on a background thread for at most MAINTENANCE_BUDGET seconds
+MAINTENANCE_CHECK_MS = 10 * 60 * 1000
+MAINTENANCE_FIRST_CHECK_MS = 2000
+MAINTENANCE_BUDGET = 30.0
+
+class ExpenseTableModel(QAbstractTableModel):
+    """
+    The expense table, read straight from the ExpenseStore's columns: a cell is
+    only formatted when the view paints it. Archived rows (not in the store)
+    follow the store's rows.
+    """
+    HEADERS = ["Id", "Date", "Category", "Amount", "Description"]
+
+    def __init__(self, store: ExpenseStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._order = np.zeros(0, dtype=np.int64)
+        self._archived = []
+
+    def set_rows(self, mask=None, archived=()):
+        self.beginResetModel()
+        self._order = self.store.order(mask)
+        self._archived = list(archived)
+        self.endResetModel()
+
+    def row(self, r: int):
+        if r < len(self._order):
+            return self.store.row(int(self._order[r]))
+        return self._archived[r - len(self._order)]
+
+    def is_archived(self, r: int) -> bool:
+        return r >= len(self._order)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order) + len(self._archived)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return str(self.row(index.row())[index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
 class ExpenseApp(QWidget):
     def __init__(self, username=None, user_id=None):
         super().__init__()
         self.username = username
         self.user_id = user_id
         self.dark_mode = False
+        with phase("ExpenseStore.load"):
+            self.store = ExpenseStore(user_id)
         self.init_ui()
         # Auto-apply recurring before first load (ensures recurring for current period present)
         self.apply_recurring_expenses()
         self.load_table_data()
 
+        self._maintenance = None
+        self.maintenance_timer = QTimer(self)
+        self.maintenance_timer.timeout.connect(self.run_idle_maintenance)
+        self.maintenance_timer.start(MAINTENANCE_FIRST_CHECK_MS)
+
     def init_ui(self):
         self.setWindowTitle(f"Expense Tracker - {self.username}")
         self.resize(900, 900)
@@ -58,10 +123,14 @@ class ExpenseApp(QWidget):
         self.restore_button = QPushButton("Restore DB")
         self.recurring_button = QPushButton("Manage Recurring")
         self.income_button = QPushButton("Manage Incomes")
+        self.cash_flow_button = QPushButton("Cash Flow")
 
         # Table
-        self.table = QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(["Id", "Date", "Category", "Amount", "Description"])
+        self.table_model = ExpenseTableModel(self.store, self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
 
         # Labels + Budget
@@ -92,8 +161,9 @@ class ExpenseApp(QWidget):
         self.restore_button.clicked.connect(self.do_restore)
         self.recurring_button.clicked.connect(self.open_recurring_manager)
         self.income_button.clicked.connect(self.open_income_manager)
+        self.cash_flow_button.clicked.connect(self.open_cash_flow)
         self.search_button.clicked.connect(self.apply_filters)
-        self.reset_filter_button.clicked.connect(self.load_table_data)
+        self.reset_filter_button.clicked.connect(self.reload_data)
 
         # Layouts
         layout = QVBoxLayout()
@@ -109,6 +179,7 @@ class ExpenseApp(QWidget):
         row_actions.addWidget(self.delete_button); row_actions.addWidget(self.export_excel_button)
         row_actions.addWidget(self.export_pdf_button); row_actions.addWidget(self.set_budget_button)
         row_actions.addWidget(self.recurring_button); row_actions.addWidget(self.income_button)
+        row_actions.addWidget(self.cash_flow_button)
 
         row_tools = QHBoxLayout()
         row_tools.addWidget(self.backup_button); row_tools.addWidget(self.restore_button); row_tools.addWidget(self.toggle_dark_button)
@@ -134,7 +205,7 @@ class ExpenseApp(QWidget):
                 QWidget { font-family: Arial; font-size: 14px; background: #121212; color: #e0e0e0; }
                 QLineEdit, QComboBox, QDateEdit { background: #1e1e1e; border: 1px solid #333; padding: 4px; color: #e0e0e0; }
                 QPushButton { background: #2c2c2c; border: 1px solid #444; padding: 6px; color: #fff; }
-                QTableWidget { background: #1a1a1a; }
+                QTableView { background: #1a1a1a; }
                 QProgressBar { background: #1e1e1e; border: 1px solid #333; }
             """)
         else:
@@ -145,38 +216,45 @@ class ExpenseApp(QWidget):
         self.apply_styles()
 
     # ---------- Data ----------
+    @profiled
+    def reload_data(self):
+        # The store only tracks this window's own changes; re-read to pick up
+        # writes from other processes (importer, scheduler) or a restore
+        with phase("ExpenseStore.load"):
+            self.store.load()
+        self.load_table_data()
+
+    @profiled
     def load_table_data(self):
-        expenses = fetch_expenses(self.user_id)
-        self.populate_table(expenses)
-        self.update_totals_and_chart(expenses)
+        self.populate_table()
+        self.update_totals_and_chart()
 
-    def populate_table(self, expenses):
-        self.table.setRowCount(0)
-        for row_idx, expense in enumerate(expenses):
-            self.table.insertRow(row_idx)
-            for col_idx, data in enumerate(expense):
-                self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(data)))
+    @profiled
+    def populate_table(self, mask=None, archived=()):
+        self.table_model.set_rows(mask, archived)
 
+    @profiled
     def apply_filters(self):
         start_date = self.filter_start_date.date().toString("yyyy-MM-dd")
         end_date = self.filter_end_date.date().toString("yyyy-MM-dd")
         category = self.filter_category.currentText()
         keyword = self.search_box.text().strip().lower()
 
-        all_expenses = fetch_expenses(self.user_id)
-        filtered = []
-        for exp in all_expenses:
-            exp_id, date, exp_category, amount, desc = exp
-            if date < start_date or date > end_date:
-                continue
-            if category != "All" and exp_category != category:
-                continue
-            if keyword and keyword not in (desc or "").lower():
-                continue
-            filtered.append(exp)
-
-        self.populate_table(filtered)
-        self.update_totals_and_chart(filtered, filtered_mode=True)
+        with phase("store.mask"):
+            mask = self.store.mask(start_date, end_date, category, keyword)
+        archived_rows = []
+        if archived_years_in_range(start_date, end_date, db_path_for(self.user_id)):
+            # Closed years never count towards this month/year totals, so they only extend the table
+            with phase("fetch_expenses_range"):
+                archived = fetch_expenses_range(self.user_id, start_date, end_date, include_hot=False)
+            for exp in archived:
+                if category != "All" and exp[2] != category:
+                    continue
+                if keyword and keyword not in (exp[4] or "").lower():
+                    continue
+                archived_rows.append(exp)
+        self.populate_table(mask, archived_rows)
+        self.update_totals_and_chart(mask, filtered_mode=True)
 
     # ---------- CRUD ----------
     def add_expense(self):
@@ -194,22 +272,32 @@ class ExpenseApp(QWidget):
             QMessageBox.warning(self, "Input Error", "Amount must be a number!")
             return
 
-        if add_expense_to_db(date_str, category, amount, description, self.user_id):
+        if self.store.add(date_str, category, amount, description):
             self.load_table_data()
             self.clear_inputs()
         else:
             QMessageBox.critical(self, "Error", "Failed to add expense")
 
     def delete_expense(self):
-        row = self.table.currentRow()
+        row = self.table.currentIndex().row()
         if row == -1:
             QMessageBox.warning(self, "No Selection", "Please select an expense to delete.")
             return
-        expense_id = int(self.table.item(row, 0).text())
+        if self.table_model.is_archived(row):
+            QMessageBox.information(self, "Archived Expense",
+                                    "This expense is in a sealed archive of a closed year and cannot be deleted.")
+            return
+        expense_id = self.table_model.row(row)[0]
         confirm = QMessageBox.question(self, "Confirm Delete", "Delete selected expense?",
                                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-        if confirm == QMessageBox.StandardButton.Yes and delete_expense_from_db(expense_id):
+        if confirm != QMessageBox.StandardButton.Yes:
+            return
+        if self.store.delete(expense_id):
             self.load_table_data()
+        else:
+            # Gone already (e.g. deleted or archived elsewhere): show what is really there
+            QMessageBox.warning(self, "Not Deleted", "The expense could not be deleted; it may no longer exist.")
+            self.reload_data()
 
     def clear_inputs(self):
         self.date_box.setDate(QDate.currentDate())
@@ -226,34 +314,20 @@ class ExpenseApp(QWidget):
             self.load_table_data()
 
     # ---------- Totals / Chart ----------
-    def update_totals_and_chart(self, expenses, filtered_mode: bool = False):
+    @profiled
+    def update_totals_and_chart(self, mask=None, filtered_mode: bool = False):
         current_month = QDate.currentDate().toString("yyyy-MM")
         current_year = QDate.currentDate().toString("yyyy")
 
-        total_month = 0.0
-        total_year = 0.0
-        category_totals = {}
-
-        for exp in expenses:
-            date = exp[1]
-            category = exp[2]
-            try:
-                amount = float(exp[3])
-            except Exception:
-                amount = 0.0
-
-            if date.startswith(current_month):
-                total_month += amount
-                category_totals[category] = category_totals.get(category, 0.0) + amount
-
-            if date.startswith(current_year):
-                total_year += amount
+        with phase("store.totals"):
+            total_month, total_year, category_totals = self.store.totals(current_month, current_year, mask)
 
         prefix = "Filtered " if filtered_mode else ""
         self.total_monthly_label.setText(f"🟢 {prefix}Total This Month: ₹ {total_month:.2f}")
         self.total_yearly_label.setText(f"🔵 {prefix}Total This Year: ₹ {total_year:.2f}")
 
-        budget = get_monthly_budget(self.user_id)
+        with phase("get_monthly_budget"):
+            budget = get_monthly_budget(self.user_id)
         if budget:
             remaining = budget - total_month
             percent = min(int((total_month / budget) * 100), 100) if budget > 0 else 0
@@ -261,48 +335,70 @@ class ExpenseApp(QWidget):
             self.budget_progress.setValue(percent)
             if total_month > budget:
                 self.budget_progress.setStyleSheet("QProgressBar::chunk { background: red; }")
-                QMessageBox.critical(self, "⚠ Budget Exceeded", f"You have exceeded your monthly budget of ₹{budget:.2f}!\nCurrent spending: ₹{total_month:.2f}")
+                with phase("QMessageBox", title="Budget Exceeded"):
+                    QMessageBox.critical(self, "⚠ Budget Exceeded", f"You have exceeded your monthly budget of ₹{budget:.2f}!\nCurrent spending: ₹{total_month:.2f}")
             elif total_month > budget * 0.8:
                 self.budget_progress.setStyleSheet("QProgressBar::chunk { background: orange; }")
-                QMessageBox.warning(self, "⚠ Budget Alert", f"You have used more than 80% of your monthly budget (₹{budget:.2f}).\nCurrent spending: ₹{total_month:.2f}")
+                with phase("QMessageBox", title="Budget Alert"):
+                    QMessageBox.warning(self, "⚠ Budget Alert", f"You have used more than 80% of your monthly budget (₹{budget:.2f}).\nCurrent spending: ₹{total_month:.2f}")
             else:
                 self.budget_progress.setStyleSheet("QProgressBar::chunk { background: green; }")
+                # Early warning: on track today, but the month-end projection exceeds the budget.
+                # The projection covers all of the month's spending, so filtered totals skip it;
+                # it is cached until the user's data (or the day) changes
+                if not filtered_mode:
+                    today = QDate.currentDate().toString("yyyy-MM-dd")
+                    with phase("month_end_forecast"):
+                        forecast = cached_for_user(self.user_id, ("month_end_forecast", today),
+                                                   lambda: month_end_forecast([self.user_id]))
+                    if not forecast.empty and forecast["over_budget"].iloc[0]:
+                        self.budget_status_label.setText(
+                            self.budget_status_label.text() + f" | 📈 Projected: ₹{forecast['forecast'].iloc[0]:.2f}")
+                        self.budget_progress.setStyleSheet("QProgressBar::chunk { background: goldenrod; }")
         else:
             self.budget_status_label.setText("💡 Set a monthly budget to track spending.")
             self.budget_progress.setValue(0)
 
         # Pie chart
-        series = QPieSeries()
-        for cat, amt in category_totals.items():
-            if amt > 0:
-                series.append(cat, amt)
-        chart = QChart(); chart.addSeries(series)
-        chart.setTitle("Spending by Category")
-        chart.legend().setAlignment(Qt.AlignmentFlag.AlignBottom)
-        self.chart_view.setChart(chart)
+        with phase("chart"):
+            series = QPieSeries()
+            for cat, amt in category_totals.items():
+                if amt > 0:
+                    series.append(cat, amt)
+            chart = QChart(); chart.addSeries(series)
+            chart.setTitle("Spending by Category")
+            chart.legend().setAlignment(Qt.AlignmentFlag.AlignBottom)
+            self.chart_view.setChart(chart)
 
     # ---------- Export ----------
+    @profiled
     def export_to_excel(self):
-        expenses = fetch_expenses(self.user_id)
+        with phase("fetch_all_expenses"):
+            expenses = fetch_all_expenses(self.user_id)
         if not expenses:
             QMessageBox.information(self, "No Data", "No expenses to export.")
             return
         df = pd.DataFrame(expenses, columns=["ID", "Date", "Category", "Amount", "Description"])
-        path, _ = QFileDialog.getSaveFileName(self, "Save Excel", "expenses.xlsx", "Excel Files (*.xlsx)")
+        with phase("QFileDialog"):
+            path, _ = QFileDialog.getSaveFileName(self, "Save Excel", "expenses.xlsx", "Excel Files (*.xlsx)")
         if not path:
             return
         try:
-            df.to_excel(path, index=False)
+            with phase("to_excel"):
+                df.to_excel(path, index=False)
             QMessageBox.information(self, "Export Successful", f"Saved: {path}")
         except Exception as e:
             QMessageBox.critical(self, "Export Failed", f"{e}")
 
+    @profiled
     def export_to_pdf(self):
-        expenses = fetch_expenses(self.user_id)
+        with phase("fetch_all_expenses"):
+            expenses = fetch_all_expenses(self.user_id)
         if not expenses:
             QMessageBox.information(self, "No Data", "No expenses to export.")
             return
-        path, _ = QFileDialog.getSaveFileName(self, "Save PDF", "expenses.pdf", "PDF Files (*.pdf)")
+        with phase("QFileDialog"):
+            path, _ = QFileDialog.getSaveFileName(self, "Save PDF", "expenses.pdf", "PDF Files (*.pdf)")
         if not path:
             return
         pdf = SimpleDocTemplate(path, pagesize=A4); styles = getSampleStyleSheet(); elements = []
@@ -317,7 +413,8 @@ class ExpenseApp(QWidget):
         ]))
         elements.append(Paragraph("Expense Report", styles["Title"])); elements.append(table)
         try:
-            pdf.build(elements)
+            with phase("pdf.build"):
+                pdf.build(elements)
             QMessageBox.information(self, "Export Successful", f"Saved: {path}")
         except Exception as e:
             QMessageBox.critical(self, "Export Failed", f"{e}")
@@ -326,7 +423,7 @@ class ExpenseApp(QWidget):
     def do_backup(self):
         path, _ = QFileDialog.getSaveFileName(self, "Backup Database", "expense_backup.db", "DB Files (*.db)")
         if not path: return
-        if backup_db(path): QMessageBox.information(self, "Backup", f"Saved: {path}")
+        if backup_db(path, self.user_id): QMessageBox.information(self, "Backup", f"Saved: {path}")
         else: QMessageBox.critical(self, "Backup Failed", "Could not backup.")
 
     def do_restore(self):
@@ -335,10 +432,13 @@ class ExpenseApp(QWidget):
         confirm = QMessageBox.question(self, "Confirm Restore", "Restoring will replace current data. Continue?",
                                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if confirm == QMessageBox.StandardButton.Yes:
-            if restore_db(path): QMessageBox.information(self, "Restore", "Database restored. Restart the app.")
+            if restore_db(path, self.user_id):
+                self.reload_data()
+                QMessageBox.information(self, "Restore", "Database restored.")
             else: QMessageBox.critical(self, "Restore Failed", "Could not restore DB.")
 
     # ---------- Recurring (Auto-add) ----------
+    @profiled
     def apply_recurring_expenses(self):
         """
         Auto-add recurring expenses for current month (Monthly) and current week (Weekly)
@@ -348,7 +448,7 @@ class ExpenseApp(QWidget):
         if not recs:
             return
 
-        existing = fetch_expenses(self.user_id)
+        existing = self.store.rows()
         # build set keys: (category, description, period_id)
         existing_keys = set()
         for e in existing:
@@ -374,7 +474,7 @@ class ExpenseApp(QWidget):
                 key = ("M", category, description, period)
                 if key not in existing_keys:
                     today = datetime.today().strftime("%Y-%m-%d")
-                    add_expense_to_db(today, category, amount, description or f"Recurring ({category})", self.user_id)
+                    self.store.add(today, category, amount, description or f"Recurring ({category})")
             elif interval == "Weekly":
                 qd = QDate.currentDate()
                 py = qd.year(); pm = qd.month(); pd = qd.day()
@@ -383,7 +483,25 @@ class ExpenseApp(QWidget):
                 key = ("W", category, description, period)
                 if key not in existing_keys:
                     today = datetime.today().strftime("%Y-%m-%d")
-                    add_expense_to_db(today, category, amount, description or f"Recurring ({category})", self.user_id)
+                    self.store.add(today, category, amount, description or f"Recurring ({category})")
+
+    # ---------- Maintenance ----------
+    @profiled
+    def run_idle_maintenance(self):
+        # Only decides when to start a pass; the work happens off the event loop
+        self.maintenance_timer.setInterval(MAINTENANCE_CHECK_MS)
+        if self._maintenance is not None and self._maintenance.is_alive():
+            return
+        # Never compete with a dialog the user is looking at
+        if QApplication.activeModalWidget() is not None:
+            return
+        try:
+            # In tenant mode this is the user's own file
+            db_path = db_path_for(self.user_id)
+            if is_due(db_path):
+                self._maintenance = start_background_maintenance(db_path, MAINTENANCE_BUDGET)
+        except Exception as e:
+            print("Maintenance error:", e)
 
     def open_recurring_manager(self):
         dlg = RecurringExpenseManager(self.user_id, parent=self)
@@ -396,6 +514,11 @@ class ExpenseApp(QWidget):
         dlg.exec()
         self.load_table_data()
 
+    @profiled
+    def open_cash_flow(self):
+        dlg = CashFlowReport(self.user_id, parent=self)
+        dlg.exec()
+
 # ---------- Dialogs ----------
 class RecurringExpenseManager(QDialog):
     def __init__(self, user_id: int, parent=None):
@@ -451,7 +574,7 @@ class RecurringExpenseManager(QDialog):
         if row == -1:
             QMessageBox.warning(self, "Select", "Select a recurring item to delete."); return
         rec_id = int(self.rec_table.item(row, 0).text())
-        if delete_recurring_expense(rec_id):
+        if delete_recurring_expense(rec_id, self.user_id):
             self.load_recurring()
 
 class IncomeManager(QDialog):
@@ -502,5 +625,94 @@ class IncomeManager(QDialog):
         if row == -1:
             QMessageBox.warning(self, "Select", "Select an income to delete."); return
         inc_id = int(self.inc_table.item(row, 0).text())
-        if delete_income(inc_id):
+        if delete_income(inc_id, self.user_id):
             self.load_incomes()
+
+class CashFlowReport(QDialog):
+    HEADERS = ["Month", "Income", "Expense", "Net", "Balance"]
+
+    def __init__(self, user_id: int, parent=None):
+        super().__init__(parent)
+        self.user_id = user_id
+        self.setWindowTitle("Cash Flow")
+        self.resize(760, 640)
+        layout = QVBoxLayout(self)
+
+        with phase("cash_flow"):
+            self.rows = cash_flow(user_id)
+
+        self.cf_table = QTableWidget(0, 5)
+        self.cf_table.setHorizontalHeaderLabels(self.HEADERS)
+        self.cf_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        for r in reversed(self.rows):
+            row = self.cf_table.rowCount(); self.cf_table.insertRow(row)
+            self.cf_table.setItem(row, 0, QTableWidgetItem(r[0]))
+            for i, val in enumerate(r[1:], start=1):
+                self.cf_table.setItem(row, i, QTableWidgetItem(f"{val:.2f}"))
+        layout.addWidget(self.cf_table)
+
+        self.chart_view = QChartView(); self.chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.chart_view.setChart(self.build_chart())
+        layout.addWidget(self.chart_view)
+
+        btns = QHBoxLayout()
+        self.excel_btn = QPushButton("Export to Excel"); self.pdf_btn = QPushButton("Export to PDF")
+        btns.addWidget(self.excel_btn); btns.addWidget(self.pdf_btn); layout.addLayout(btns)
+        self.excel_btn.clicked.connect(self.export_to_excel); self.pdf_btn.clicked.connect(self.export_to_pdf)
+
+    def build_chart(self, months: int = 12):
+        # Income/expense bars and the running balance for the most recent months
+        recent = self.rows[-months:]
+        income = QBarSet("Income"); expense = QBarSet("Expense")
+        balance = QLineSeries(); balance.setName("Balance")
+        for i, (_, inc, exp, _, bal) in enumerate(recent):
+            income.append(inc); expense.append(exp); balance.append(i, bal)
+        bars = QBarSeries(); bars.append(income); bars.append(expense)
+
+        chart = QChart(); chart.addSeries(bars); chart.addSeries(balance)
+        chart.setTitle("Monthly Cash Flow")
+        axis_x = QBarCategoryAxis(); axis_x.append([r[0] for r in recent])
+        values = [v for r in recent for v in (r[1], r[2], r[4])] or [0.0]
+        axis_y = QValueAxis(); axis_y.setRange(min(0.0, min(values)), max(values) or 1.0)
+        chart.addAxis(axis_x, Qt.AlignmentFlag.AlignBottom); chart.addAxis(axis_y, Qt.AlignmentFlag.AlignLeft)
+        for series in (bars, balance):
+            series.attachAxis(axis_x); series.attachAxis(axis_y)
+        chart.legend().setAlignment(Qt.AlignmentFlag.AlignBottom)
+        return chart
+
+    @profiled
+    def export_to_excel(self):
+        if not self.rows:
+            QMessageBox.information(self, "No Data", "No cash flow to export."); return
+        path, _ = QFileDialog.getSaveFileName(self, "Save Excel", "cash_flow.xlsx", "Excel Files (*.xlsx)")
+        if not path:
+            return
+        try:
+            pd.DataFrame(self.rows, columns=self.HEADERS).to_excel(path, index=False)
+            QMessageBox.information(self, "Export Successful", f"Saved: {path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Export Failed", f"{e}")
+
+    @profiled
+    def export_to_pdf(self):
+        if not self.rows:
+            QMessageBox.information(self, "No Data", "No cash flow to export."); return
+        path, _ = QFileDialog.getSaveFileName(self, "Save PDF", "cash_flow.pdf", "PDF Files (*.pdf)")
+        if not path:
+            return
+        pdf = SimpleDocTemplate(path, pagesize=A4); styles = getSampleStyleSheet(); elements = []
+        data = [list(self.HEADERS)]
+        for r in self.rows:
+            data.append([r[0]] + [f"{v:.2f}" for v in r[1:]])
+        table = Table(data); table.setStyle(TableStyle([
+            ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#4caf50")),
+            ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+            ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
+            ("ALIGN", (0,0), (-1,-1), "CENTER"),
+        ]))
+        elements.append(Paragraph("Cash Flow Statement", styles["Title"])); elements.append(table)
+        try:
+            pdf.build(elements)
+            QMessageBox.information(self, "Export Successful", f"Saved: {path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Export Failed", f"{e}")
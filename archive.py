@@ -0,0 +1,174 @@
+# archive.py
+import os
+import shutil
+import sqlite3
+import stat
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from urllib.request import pathname2url
+
+import database
+
+# SQLite's default SQLITE_MAX_ATTACHED is 10; keep one slot spare
+_MAX_ATTACH = 9
+
+_EXPENSES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {schema}.expenses (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT,
+    user_id INTEGER NOT NULL
+)
+"""
+
+# Archives depend only on the database file they belong to (db_path, default
+# DB_NAME): archives/<file name>_<year>.db next to it, so tenant files sharing
+# a directory never collide and every command finds the same files
+def archive_dir(db_path: Optional[str] = None) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or database.DB_NAME)), "archives")
+
+def archive_path(year: int, db_path: Optional[str] = None) -> str:
+    stem = os.path.splitext(os.path.basename(db_path or database.DB_NAME))[0]
+    path = os.path.join(archive_dir(db_path), f"{stem}_{year}.db")
+    # Archives were once always named expense_<year>.db
+    legacy = os.path.join(archive_dir(db_path), f"expense_{year}.db")
+    if not os.path.exists(path) and os.path.exists(legacy):
+        return legacy
+    return path
+
+def _set_read_only(path: str, read_only: bool):
+    mode = os.stat(path).st_mode
+    writable = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+    os.chmod(path, (mode & ~writable) if read_only else (mode | stat.S_IWUSR))
+
+# ---------- Archiving ----------
+def archive_year(year: int, db_path: Optional[str] = None) -> int:
+    """
+    Move all expenses dated in `year` out of the hot database into a sealed,
+    read-only per-year file. Only closed years (before the current one) can be
+    archived. Re-running for an already archived year appends late entries.
+    Returns the number of rows moved.
+    """
+    if year >= date.today().year:
+        raise ValueError(f"{year} is not a closed year")
+    path = archive_path(year, db_path)
+    os.makedirs(archive_dir(db_path), exist_ok=True)
+    if os.path.exists(path):
+        _set_read_only(path, False)
+
+    start, end = f"{year}-01-01", f"{year}-12-31"
+    conn = sqlite3.connect(db_path or database.DB_NAME, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS arc", (path,))
+        conn.execute(_EXPENSES_SCHEMA.format(schema="arc"))
+        conn.execute("CREATE INDEX IF NOT EXISTS arc.idx_expenses_user_date ON expenses(user_id, date)")
+        # Moving rows and updating the manifest commit atomically across both files
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO arc.expenses (id, date, category, amount, description, user_id) "
+                "SELECT id, date, category, amount, description, user_id FROM main.expenses WHERE date BETWEEN ? AND ?",
+                (start, end)
+            )
+            moved = conn.execute("DELETE FROM main.expenses WHERE date BETWEEN ? AND ?", (start, end)).rowcount
+            total = conn.execute("SELECT COUNT(*) FROM arc.expenses").fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO main.archives (year, path, row_count, sealed_at) VALUES (?,?,?,?)",
+                (year, os.path.relpath(path, archive_dir(db_path)), total, datetime.now().isoformat(timespec="seconds"))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("DETACH DATABASE arc")
+    finally:
+        conn.close()
+
+    _seal(path)
+    database.clear_read_cache()
+    return moved
+
+def _seal(path: str):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    _set_read_only(path, True)
+
+def archived_years(db_path: Optional[str] = None) -> List[int]:
+    conn = sqlite3.connect(db_path or database.DB_NAME)
+    try:
+        return [r[0] for r in conn.execute("SELECT year FROM archives ORDER BY year")]
+    finally:
+        conn.close()
+
+def archived_years_in_range(start_date: str, end_date: str, db_path: Optional[str] = None) -> List[int]:
+    lo, hi = int(start_date[:4]), int(end_date[:4])
+    return [y for y in archived_years(db_path) if lo <= y <= hi]
+
+# ---------- Querying ----------
+def fetch_expenses_range(user_id: int, start_date: str, end_date: str, include_hot: bool = True) -> List[Tuple]:
+    """
+    Expenses between start_date and end_date (inclusive, 'YYYY-MM-DD'), newest
+    first. Archive files are ATTACHed read-only only for the years the range
+    reaches and queried through a UNION ALL view together with the hot table.
+    """
+    db_path = database.db_path_for(user_id)
+    years = [y for y in archived_years_in_range(start_date, end_date, db_path) if os.path.exists(archive_path(y, db_path))]
+    chunks = [years[i:i + _MAX_ATTACH] for i in range(0, len(years), _MAX_ATTACH)] or [[]]
+    rows: List[Tuple] = []
+    for n, chunk in enumerate(chunks):
+        rows.extend(_query_union(db_path, user_id, start_date, end_date, chunk, include_hot and n == 0))
+    if len(chunks) > 1:
+        rows.sort(key=lambda r: (r[1], r[0]), reverse=True)
+    return rows
+
+def fetch_all_expenses(user_id: int) -> List[Tuple]:
+    """Every expense of the user, hot and archived, newest first (like fetch_expenses)."""
+    return fetch_expenses_range(user_id, "0000-01-01", "9999-12-31")
+
+def _query_union(db_path: str, user_id: int, start_date: str, end_date: str, years: List[int],
+                 include_hot: bool) -> List[Tuple]:
+    # uri=True lets ATTACH open the archives with mode=ro
+    conn = sqlite3.connect(db_path, uri=True)
+    try:
+        selects = []
+        if include_hot:
+            selects.append("SELECT id, date, category, amount, description, user_id FROM main.expenses")
+        for y in years:
+            uri = "file:" + pathname2url(archive_path(y, db_path)) + "?mode=ro"
+            conn.execute(f"ATTACH DATABASE ? AS y{y}", (uri,))
+            selects.append(f"SELECT id, date, category, amount, description, user_id FROM y{y}.expenses")
+        if not selects:
+            return []
+        conn.execute("CREATE TEMP VIEW all_expenses AS " + " UNION ALL ".join(selects))
+        return conn.execute(
+            "SELECT id, date, category, amount, description FROM all_expenses "
+            "WHERE user_id=? AND date BETWEEN ? AND ? ORDER BY date DESC, id DESC",
+            (user_id, start_date, end_date)
+        ).fetchall()
+    finally:
+        conn.close()
+
+# ---------- Backup ----------
+def backup_archives(dest_dir: str, db_path: Optional[str] = None) -> int:
+    """Copy sealed archives to dest_dir, skipping ones whose copy is already current."""
+    os.makedirs(dest_dir, exist_ok=True)
+    copied = 0
+    for y in archived_years(db_path):
+        src = archive_path(y, db_path)
+        if not os.path.exists(src):
+            continue
+        dst = os.path.join(dest_dir, os.path.basename(src))
+        s = os.stat(src)
+        if os.path.exists(dst):
+            d = os.stat(dst)
+            if d.st_size == s.st_size and d.st_mtime_ns == s.st_mtime_ns:
+                continue
+            _set_read_only(dst, False)
+        shutil.copy2(src, dst)
+        copied += 1
+    return copied
@@ -0,0 +1,55 @@
+# bench_analytics.py
+# Times the nightly analytics pass on synthetic ledgers of growing size.
+# Usage: python bench_analytics.py [users ...]   (e.g. python bench_analytics.py 100 200 400)
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import database
+from analytics import run_nightly, monthly_category_totals, rolling_averages, month_end_forecast, detect_outliers
+
+CATEGORIES = ["Food", "Transportation", "Rent", "Shopping", "Entertainment", "Bills", "Other"]
+EXPENSES_PER_USER = 1000
+TODAY = date(2026, 6, 15)
+
+def build_db(path: str, users: int):
+    database.init_db(path)
+    rnd = random.Random(users)
+    start = TODAY - timedelta(days=3 * 365)
+    rows = [
+        ((start + timedelta(days=rnd.randrange(3 * 365))).isoformat(), rnd.choice(CATEGORIES),
+         round(rnd.lognormvariate(5, 1), 2), "bench", u)
+        for u in range(1, users + 1) for _ in range(EXPENSES_PER_USER)
+    ]
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO expenses (date, category, amount, description, user_id) VALUES (?,?,?,?,?)", rows)
+    conn.executemany("INSERT INTO budgets (user_id, monthly_budget) VALUES (?,?)", [(u, 5000.0) for u in range(1, users + 1)])
+    conn.commit()
+    conn.close()
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t, result
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [50, 100, 200, 400]
+    print(f"{'users':>6} {'rows':>9} {'monthly':>9} {'rolling':>9} {'forecast':>9} {'outliers':>9} {'total':>9} {'us/user':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for users in sizes:
+            path = os.path.join(tmp, f"bench_{users}.db")
+            build_db(path, users)
+            t_monthly, monthly = timed(monthly_category_totals)
+            t_rolling, _ = timed(rolling_averages, monthly)
+            t_forecast, _ = timed(month_end_forecast, None, TODAY)
+            t_outliers, _ = timed(detect_outliers)
+            t_total, _ = timed(run_nightly, TODAY)
+            print(f"{users:>6} {users * EXPENSES_PER_USER:>9} {t_monthly:>9.3f} {t_rolling:>9.3f} {t_forecast:>9.3f} "
+                  f"{t_outliers:>9.3f} {t_total:>9.3f} {t_total / users * 1e6:>9.0f}")
+
+if __name__ == "__main__":
+    main()
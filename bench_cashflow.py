@@ -0,0 +1,68 @@
+# bench_cashflow.py
+# Times the cash-flow statement (window-function query) on synthetic ledgers,
+# with every year in the hot table and with closed years in sealed archives.
+# Usage: python bench_cashflow.py [years ...]   (e.g. python bench_cashflow.py 5 10 22)
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import database
+from archive import archive_year
+from cashflow import cash_flow
+
+USERS = 3
+ROWS_PER_YEAR = 2300       # expenses per user per year (about 50k over 22 years)
+INCOMES_PER_YEAR = 24
+REPEAT = 5
+
+def build_db(path: str, years: int):
+    database.init_db(path)
+    rnd = random.Random(years)
+    last = date(date.today().year - 1, 12, 31)
+    start = date(last.year - years + 1, 1, 1)
+    span = (last - start).days + 1
+    day = lambda: (start + timedelta(days=rnd.randrange(span))).isoformat()
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO expenses (date, category, amount, description, user_id) VALUES (?,?,?,?,?)",
+                     [(day(), "Food", round(rnd.lognormvariate(5, 1), 2), "bench", u)
+                      for u in range(1, USERS + 1) for _ in range(years * ROWS_PER_YEAR)])
+    conn.executemany("INSERT INTO incomes (date, source, amount, notes, user_id) VALUES (?,?,?,?,?)",
+                     [(day(), "Salary", 50000.0, "bench", u)
+                      for u in range(1, USERS + 1) for _ in range(years * INCOMES_PER_YEAR)])
+    conn.commit()
+    conn.close()
+    return range(start.year, last.year + 1)
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t, result
+
+def best_uncached(user_id: int) -> float:
+    database.configure_read_cache(0)
+    try:
+        return min(timed(cash_flow, user_id)[0] for _ in range(REPEAT))
+    finally:
+        database.configure_read_cache()
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [5, 10, 22]
+    print(f"{'years':>6} {'rows/user':>10} {'months':>7} {'hot s':>9} {'archived s':>11} {'cached s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for years in sizes:
+            path = os.path.join(tmp, f"bench_{years}.db")
+            closed = build_db(path, years)
+            t_hot = best_uncached(1)
+            for y in closed:
+                archive_year(y, path)
+            t_archived = best_uncached(1)
+            cash_flow(1)
+            t_cached, rows = timed(cash_flow, 1)
+            print(f"{years:>6} {years * ROWS_PER_YEAR:>10} {len(rows):>7} {t_hot:>9.3f} {t_archived:>11.3f} {t_cached:>9.5f}")
+
+if __name__ == "__main__":
+    main()
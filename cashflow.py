@@ -0,0 +1,65 @@
+# cashflow.py
+import os
+import sqlite3
+from typing import List, Tuple
+from urllib.request import pathname2url
+
+import database
+from archive import archive_path, archived_years
+
+# SQLite's default SQLITE_MAX_ATTACHED is 10; keep one slot spare
+_MAX_ATTACH = 9
+
+# Each side is aggregated per month first (using the (user_id, date) indexes),
+# so the window function only runs over one row per month.
+_CASH_FLOW_SQL = """
+WITH flows AS (
+    SELECT substr(date, 1, 7) AS month, SUM(amount) AS income, 0.0 AS expense
+    FROM incomes WHERE user_id=? GROUP BY month
+    UNION ALL
+    SELECT substr(date, 1, 7) AS month, 0.0 AS income, SUM(amount) AS expense
+    FROM expenses WHERE user_id=? GROUP BY month
+    UNION ALL
+    SELECT month, 0.0 AS income, expense FROM temp.archived_monthly
+),
+monthly AS (
+    SELECT month, SUM(income) AS income, SUM(expense) AS expense
+    FROM flows GROUP BY month
+)
+SELECT month, income, expense, income - expense AS net,
+       SUM(income - expense) OVER (ORDER BY month ROWS UNBOUNDED PRECEDING) AS balance
+FROM monthly
+ORDER BY month
+"""
+
+def cash_flow(user_id: int) -> List[Tuple]:
+    """
+    Monthly (month, income, expense, net, running balance) for a user, oldest
+    first, including expenses in sealed archives. Cached until the user's
+    data changes.
+    """
+    return database.cached_for_user(user_id, ("cash_flow",), lambda: _query(user_id))
+
+def _query(user_id: int) -> List[Tuple]:
+    db_path = database.db_path_for(user_id)
+    years = [y for y in archived_years(db_path) if os.path.exists(archive_path(y, db_path))]
+    conn = sqlite3.connect(db_path, uri=True)
+    try:
+        conn.execute("CREATE TEMP TABLE archived_monthly (month TEXT, expense REAL)")
+        # Archives are pre-aggregated in ATTACH-limit sized groups
+        for i in range(0, len(years), _MAX_ATTACH):
+            chunk = years[i:i + _MAX_ATTACH]
+            for y in chunk:
+                conn.execute(f"ATTACH DATABASE ? AS y{y}", ("file:" + pathname2url(archive_path(y, db_path)) + "?mode=ro",))
+            union = " UNION ALL ".join(f"SELECT date, amount FROM y{y}.expenses WHERE user_id=?" for y in chunk)
+            conn.execute(
+                "INSERT INTO temp.archived_monthly "
+                f"SELECT substr(date, 1, 7), SUM(amount) FROM ({union}) GROUP BY 1",
+                (user_id,) * len(chunk)
+            )
+            conn.commit()
+            for y in chunk:
+                conn.execute(f"DETACH DATABASE y{y}")
+        return conn.execute(_CASH_FLOW_SQL, (user_id, user_id)).fetchall()
+    finally:
+        conn.close()
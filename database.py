@@ -1,83 +1,457 @@
 # database.py
 import os
-import shutil
 import sqlite3
-from typing import List, Tuple, Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Tuple, Optional
+from urllib.request import pathname2url
 import bcrypt
+from db_writer import WriteQueue, WriteJob
 
 DB_NAME = "expense.db"
+# Tenant mode: DB_NAME only holds users and the tenants directory; each user's
+# data lives in its own file under TENANT_DIR (see tenancy.py)
+TENANT_DIR: Optional[str] = None
+_tenant_paths: Dict[int, str] = {}
+_tenant_lock = threading.Lock()
+# One writer per database file; created on first write while writers are enabled
+_writers: Dict[str, WriteQueue] = {}
+_writer_window: Optional[float] = None
+_writers_lock = threading.Lock()
 
-def _conn():
-    return sqlite3.connect(DB_NAME)
+def _conn(path: Optional[str] = None):
+    return sqlite3.connect(path or DB_NAME)
 
-def init_db(db_name: str = DB_NAME) -> bool:
-    global DB_NAME
+# ---------- Writer ----------
+def start_writer(window: float = 0.005) -> WriteQueue:
+    """Route all mutations through a group-committing writer connection per database file."""
+    global _writer_window
+    _writer_window = window
+    return _writer_for(DB_NAME)
+
+def _writer_for(path: str) -> Optional[WriteQueue]:
+    with _writers_lock:
+        if _writer_window is None:
+            return None
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = WriteQueue(path, window=_writer_window)
+        return writer
+
+def _close_writers(paths: Optional[List[str]] = None):
+    # Writers are recreated on the next write while still enabled
+    with _writers_lock:
+        closing = [_writers.pop(p) for p in (list(_writers) if paths is None else paths) if p in _writers]
+    for writer in closing:
+        writer.close()
+
+def stop_writer():
+    global _writer_window
+    with _writers_lock:
+        _writer_window = None
+    _close_writers()
+
+def writer_stats(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    writer = _writers.get(path or DB_NAME)
+    return writer.stats() if writer else None
+
+def writes_pending(path: Optional[str] = None) -> bool:
+    """True while this process has writes for the file queued or being committed."""
+    writer = _writers.get(path or DB_NAME)
+    return writer is not None and writer.pending() > 0
+
+# ---------- Tenants ----------
+def _resolve(path: str) -> str:
+    # Relative tenant paths are stored relative to the directory database
+    return os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), path)
+
+def db_path_for(user_id: Optional[int], create: bool = False) -> str:
+    """
+    Database file holding user_id's data: DB_NAME, or the user's tenant file in
+    tenant mode. Only writers pass create=True; for a user without a file yet
+    reads go to the directory database, whose data tables are empty.
+    """
+    if TENANT_DIR is None:
+        return DB_NAME
+    if user_id is None:
+        raise ValueError("user_id is required in tenant mode")
+    path = tenant_path(user_id)
+    if path is None:
+        return _create_tenant(user_id) if create else DB_NAME
+    return path
+
+def tenant_path(user_id: int) -> Optional[str]:
+    """The user's tenant file, or None if it has not been created (or not in tenant mode)."""
+    if TENANT_DIR is None:
+        return None
+    path = _tenant_paths.get(user_id)
+    if path is None:
+        row = _read("SELECT path FROM tenants WHERE user_id=?", (user_id,), fetch="one")
+        if row is None:
+            return None
+        path = _tenant_paths[user_id] = _resolve(row[0])
+    return path
+
+def _create_tenant(user_id: int) -> str:
+    with _tenant_lock:
+        path = os.path.join(TENANT_DIR, f"user_{user_id}.db")
+        os.makedirs(TENANT_DIR, exist_ok=True)
+        init_tenant_file(path)
+        base = os.path.dirname(os.path.abspath(DB_NAME))
+        stored = os.path.relpath(os.path.abspath(path), base)
+        if stored.startswith(os.pardir):
+            stored = os.path.abspath(path)
+        _write(lambda cur: cur.execute(
+            "INSERT OR IGNORE INTO tenants (user_id, path, created_at) VALUES (?, ?, datetime('now'))",
+            (user_id, stored)
+        ))
+        return tenant_path(user_id)
+
+def data_paths(user_ids: Optional[List[int]] = None) -> List[str]:
+    """Database files holding the given users' data (all users if None); users without a file are skipped."""
+    if TENANT_DIR is None:
+        return [DB_NAME]
+    if user_ids is None:
+        return [_resolve(r[0]) for r in _read("SELECT path FROM tenants ORDER BY user_id", ())]
+    return sorted({p for p in map(tenant_path, user_ids) if p is not None})
+
+# ---------- Read cache ----------
+class _ReadCache:
+    """
+    Bounded LRU of query results keyed by (user_id, generation, data version, query...).
+    Every mutation made here bumps the user's generation; commits from any other
+    connection or process change the file's data version. Either way entries from
+    before the write can never be served again.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0  # bumped by clear(), invalidates every user at once
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def generation(self, user_id: int) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._generations.get(user_id, 0)
+
+    def get(self, key: tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: tuple, value: Any):
+        with self._lock:
+            if key[1] != (self._epoch, self._generations.get(key[0], 0)):
+                return  # a write landed while this value was being read
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump(self, user_id: int):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "max_entries": self.max_entries}
+
+_cache = _ReadCache()
+
+def configure_read_cache(max_entries: int = 256):
+    """Resize the read cache; 0 disables caching."""
+    global _cache
+    _cache = _ReadCache(max_entries)
+
+def read_cache_stats() -> Dict[str, int]:
+    return _cache.stats()
+
+def clear_read_cache():
+    _cache.clear()
+
+def cached_for_user(user_id: int, key: tuple, loader) -> Any:
+    """
+    Return loader()'s result through the read cache. key identifies the query;
+    the entry is dropped whenever any of the user's data changes, or anything
+    at all is committed to the user's database file by another connection.
+    """
+    if _cache.max_entries <= 0:
+        return loader()
+    path = db_path_for(user_id)
+    version = _data_version(path)
+    full_key = (user_id, _cache.generation(user_id), version) + key
+    found, value = _cache.get(full_key)
+    if not found:
+        value = loader()
+        # A commit landed while loading; the value may already be stale
+        if _data_version(path) == version:
+            _cache.put(full_key, value)
+    return value
+
+# PRAGMA data_version changes whenever another connection (the writer, another
+# process or an external tool) commits to the file; it needs a connection kept open
+_watchers: Dict[str, sqlite3.Connection] = {}
+_watchers_lock = threading.Lock()
+
+def _data_version(path: str) -> int:
+    with _watchers_lock:
+        conn = _watchers.get(path)
+        if conn is None:
+            conn = _watchers[path] = sqlite3.connect(path, check_same_thread=False)
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+def _close_watchers():
+    with _watchers_lock:
+        for conn in _watchers.values():
+            conn.close()
+        _watchers.clear()
+
+def _cached_read(user_id: int, query: str, params: tuple, fetch: str = "all") -> Any:
+    value = cached_for_user(user_id, (query, params), lambda: _read(query, params, fetch, db_path_for(user_id)))
+    # Callers get their own list; cached rows are immutable tuples
+    return list(value) if fetch == "all" else value
+
+def _read(query: str, params: tuple, fetch: str = "all", path: Optional[str] = None) -> Any:
+    conn = _conn(path)
+    try:
+        cur = conn.execute(query, params)
+        return cur.fetchall() if fetch == "all" else cur.fetchone()
+    finally:
+        conn.close()
+
+def _write(job: WriteJob, path: Optional[str] = None) -> Any:
+    # Blocks until the job is committed; raises whatever the job raised.
+    writer = _writer_for(path or DB_NAME)
+    if writer is not None:
+        return writer.submit(job).result()
+    conn = _conn(path)
+    try:
+        result = job(conn.cursor())
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+def _write_for_user(user_id: int, job: WriteJob) -> Any:
+    try:
+        return _write(job, db_path_for(user_id, create=True))
+    finally:
+        _cache.bump(user_id)
+
+def _delete_owned(table: str, row_id: int, user_id: Optional[int] = None) -> bool:
+    # Deletes by id and reports the owner so that user's cache can be invalidated;
+    # False when no row had that id (already deleted, or an archived expense)
+    def job(cur):
+        cur.execute(f"SELECT user_id FROM {table} WHERE id=?", (row_id,))
+        row = cur.fetchone()
+        cur.execute(f"DELETE FROM {table} WHERE id=?", (row_id,))
+        return row[0] if row else None
+    owner = _write(job, db_path_for(user_id))
+    if owner is None:
+        return False
+    _cache.bump(owner)
+    return True
+
+# ---------- Schema ----------
+# Tables tracked in change_log: table -> (key column, replicated columns)
+CDC_TABLES = {
+    "expenses": ("id", ("id", "date", "category", "amount", "description", "user_id")),
+    "incomes": ("id", ("id", "date", "source", "amount", "notes", "user_id")),
+    "budgets": ("user_id", ("user_id", "monthly_budget")),
+    "recurring_expenses": ("id", ("id", "category", "amount", "description", "interval", "user_id")),
+    "users": ("id", ("id", "username", "password", "security_question", "security_answer")),
+}
+
+# json_object() keeps only 15 significant digits of a REAL; these columns are
+# logged as round-trip text instead and turned back into REAL by column affinity
+_CDC_REAL_COLUMNS = {"amount", "monthly_budget"}
+# JSON cannot hold BLOBs (the bcrypt hashes): these are logged as hex() and
+# turned back into bytes when a replica applies the change
+CDC_BLOB_COLUMNS = {"password", "security_answer"}
+
+def _cdc_value(col: str) -> str:
+    if col in _CDC_REAL_COLUMNS:
+        return f"CASE WHEN NEW.{col} IS NULL THEN NULL ELSE printf('%!.17g', NEW.{col}) END"
+    if col in CDC_BLOB_COLUMNS:
+        return f"CASE WHEN NEW.{col} IS NULL THEN NULL ELSE hex(NEW.{col}) END"
+    return f"NEW.{col}"
+
+def _cdc_triggers(table: str, key: str, cols: Tuple[str, ...]) -> List[str]:
+    image = "json_object(" + ", ".join(f"'{c}', {_cdc_value(c)}" for c in cols) + ")"
+    log = "INSERT INTO change_log (tbl, op, row_key, row_image) VALUES"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS cdc_{table}_ins AFTER INSERT ON {table} "
+        f"BEGIN {log} ('{table}', 'I', NEW.{key}, {image}); END",
+        f"CREATE TRIGGER IF NOT EXISTS cdc_{table}_upd AFTER UPDATE ON {table} "
+        f"BEGIN {log} ('{table}', 'U', NEW.{key}, {image}); END",
+        f"CREATE TRIGGER IF NOT EXISTS cdc_{table}_del AFTER DELETE ON {table} "
+        f"BEGIN {log} ('{table}', 'D', OLD.{key}, NULL); END",
+    ]
+
+def _create_schema(cur: sqlite3.Cursor):
+    # Only takes effect on a new, empty database; see maintenance.py for existing ones
+    cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+
+    # Users with security question/answer (answers hashed)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password BLOB NOT NULL,
+        security_question TEXT,
+        security_answer BLOB
+    )
+    """)
+
+    # Expenses
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT,
+        user_id INTEGER NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Incomes
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS incomes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        source TEXT NOT NULL,
+        amount REAL NOT NULL,
+        notes TEXT,
+        user_id INTEGER NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Budgets (monthly per user)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS budgets (
+        user_id INTEGER PRIMARY KEY,
+        monthly_budget REAL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Recurring expenses
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS recurring_expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT,
+        interval TEXT NOT NULL,   -- 'Monthly' or 'Weekly'
+        user_id INTEGER NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+    # Sealed per-year archive files (see archive.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS archives (
+        year INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        sealed_at TEXT NOT NULL
+    )
+    """)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses(user_id, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_incomes_user_date ON incomes(user_id, date)")
+
+    # Maintenance runs (see maintenance.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS maintenance_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT NOT NULL,
+        finished_at TEXT NOT NULL,
+        seconds REAL NOT NULL,
+        pages_before INTEGER,
+        pages_after INTEGER,
+        freelist_before INTEGER,
+        freelist_after INTEGER,
+        integrity TEXT
+    )
+    """)
+
+    # Change-data-capture log filled by triggers (see replicate.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        op TEXT NOT NULL,           -- 'I', 'U' or 'D'
+        row_key INTEGER NOT NULL,
+        row_image TEXT,             -- JSON of the new row; NULL for deletes
+        changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    for table, (key, cols) in CDC_TABLES.items():
+        for trigger_sql in _cdc_triggers(table, key, cols):
+            cur.execute(trigger_sql)
+
+def _create_tenants_table(cur: sqlite3.Cursor):
+    # Users -> data files in tenant mode
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS tenants (
+        user_id INTEGER PRIMARY KEY,
+        path TEXT UNIQUE NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    """)
+
+def init_tenant_file(path: str, directory: bool = False) -> bool:
+    """Create (or upgrade) the tables of a per-user tenant file, or of a directory database."""
+    try:
+        conn = _conn(path)
+        _create_schema(conn.cursor())
+        if directory:
+            _create_tenants_table(conn.cursor())
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        print("Tenant init error:", e)
+        return False
+
+def init_db(db_name: str = DB_NAME, tenant_dir: Optional[str] = None) -> bool:
+    global DB_NAME, TENANT_DIR
+    _close_writers()
+    _close_watchers()
     DB_NAME = db_name
+    TENANT_DIR = tenant_dir
+    _tenant_paths.clear()
+    _cache.clear()
     try:
         conn = _conn()
         cur = conn.cursor()
-
-        # Users with security question/answer (answers hashed)
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password BLOB NOT NULL,
-            security_question TEXT,
-            security_answer BLOB
-        )
-        """)
-
-        # Expenses
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS expenses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            category TEXT NOT NULL,
-            amount REAL NOT NULL,
-            description TEXT,
-            user_id INTEGER NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-        """)
-
-        # Incomes
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS incomes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            source TEXT NOT NULL,
-            amount REAL NOT NULL,
-            notes TEXT,
-            user_id INTEGER NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-        """)
-
-        # Budgets (monthly per user)
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS budgets (
-            user_id INTEGER PRIMARY KEY,
-            monthly_budget REAL,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-        """)
-
-        # Recurring expenses
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS recurring_expenses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            category TEXT NOT NULL,
-            amount REAL NOT NULL,
-            description TEXT,
-            interval TEXT NOT NULL,   -- 'Monthly' or 'Weekly'
-            user_id INTEGER NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-        """)
+        _create_schema(cur)
+        _create_tenants_table(cur)
 
         conn.commit()
         conn.close()
+        if tenant_dir:
+            os.makedirs(tenant_dir, exist_ok=True)
         return True
     except Exception as e:
         print("DB init error:", e)
@@ -85,21 +459,18 @@ def init_db(db_name: str = DB_NAME) -> bool:
 
 # ---------- Users ----------
 def create_user(username: str, password: str, security_question: Optional[str] = None, security_answer: Optional[str] = None) -> bool:
-    conn = _conn()
-    cur = conn.cursor()
+    hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    hashed_ans = bcrypt.hashpw(security_answer.lower().encode("utf-8"), bcrypt.gensalt()) if security_answer else None
     try:
-        hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-        hashed_ans = bcrypt.hashpw(security_answer.lower().encode("utf-8"), bcrypt.gensalt()) if security_answer else None
-        cur.execute(
+        user_id = _write(lambda cur: cur.execute(
             "INSERT INTO users (username, password, security_question, security_answer) VALUES (?,?,?,?)",
             (username, hashed_pw, security_question, hashed_ans)
-        )
-        conn.commit()
+        ).lastrowid)
+        if TENANT_DIR is not None:
+            db_path_for(user_id, create=True)
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
 def check_login(username: str, password: str) -> Optional[int]:
     conn = _conn()
@@ -126,179 +497,188 @@ def reset_password_with_answer(username: str, answer: str, new_password: str) ->
     cur = conn.cursor()
     cur.execute("SELECT security_answer FROM users WHERE username=?", (username,))
     row = cur.fetchone()
+    conn.close()
     if not row or not row[0]:
-        conn.close()
         return False
     stored = row[0]
     if bcrypt.checkpw(answer.lower().encode("utf-8"), stored):
         hashed_pw = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt())
-        cur.execute("UPDATE users SET password=? WHERE username=?", (hashed_pw, username))
-        conn.commit()
-        conn.close()
+        _write(lambda cur: cur.execute("UPDATE users SET password=? WHERE username=?", (hashed_pw, username)))
         return True
-    conn.close()
     return False
 
 # ---------- Expenses ----------
 def fetch_expenses(user_id: int) -> List[Tuple]:
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute(
+    return _cached_read(
+        user_id,
         "SELECT id, date, category, amount, description FROM expenses WHERE user_id=? ORDER BY date DESC, id DESC",
         (user_id,)
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
 
-def add_expense_to_db(date: str, category: str, amount: float, description: str, user_id: int) -> bool:
-    conn = _conn()
-    cur = conn.cursor()
+def iter_expenses(user_id: int, batch_size: int = 4096) -> Iterator[List[Tuple]]:
+    """fetch_expenses in batches of rows, read past the cache (for callers that keep their own copy)."""
+    conn = _conn(db_path_for(user_id))
     try:
+        cur = conn.execute(
+            "SELECT id, date, category, amount, description FROM expenses WHERE user_id=? ORDER BY date DESC, id DESC",
+            (user_id,)
+        )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        conn.close()
+
+def insert_expense(date: str, category: str, amount: float, description: str, user_id: int) -> Optional[int]:
+    """Like add_expense_to_db, but returns the new row id (None on failure)."""
+    def job(cur):
         cur.execute(
             "INSERT INTO expenses (date, category, amount, description, user_id) VALUES (?,?,?,?,?)",
             (date, category, float(amount), description, user_id)
         )
-        conn.commit()
-        return True
+        return cur.lastrowid
+    try:
+        return _write_for_user(user_id, job)
     except Exception as e:
         print("Add expense error:", e)
-        return False
-    finally:
-        conn.close()
+        return None
 
-def delete_expense_from_db(expense_id: int) -> bool:
-    conn = _conn()
-    cur = conn.cursor()
+def add_expense_to_db(date: str, category: str, amount: float, description: str, user_id: int) -> bool:
+    return insert_expense(date, category, amount, description, user_id) is not None
+
+def delete_expense_from_db(expense_id: int, user_id: Optional[int] = None) -> bool:
     try:
-        cur.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
-        conn.commit()
-        return True
+        return _delete_owned("expenses", expense_id, user_id)
     except Exception as e:
         print("Delete expense error:", e)
         return False
-    finally:
-        conn.close()
 
 # ---------- Incomes ----------
 def fetch_incomes(user_id: int) -> List[Tuple]:
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute(
+    return _cached_read(
+        user_id,
         "SELECT id, date, source, amount, notes FROM incomes WHERE user_id=? ORDER BY date DESC",
         (user_id,)
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
 
 def add_income(date: str, source: str, amount: float, notes: str, user_id: int) -> bool:
-    conn = _conn()
-    cur = conn.cursor()
     try:
-        cur.execute(
+        _write_for_user(user_id, lambda cur: cur.execute(
             "INSERT INTO incomes (date, source, amount, notes, user_id) VALUES (?,?,?,?,?)",
             (date, source, float(amount), notes, user_id)
-        )
-        conn.commit()
+        ))
         return True
     except Exception as e:
         print("Add income error:", e)
         return False
-    finally:
-        conn.close()
 
-def delete_income(income_id: int) -> bool:
-    conn = _conn()
-    cur = conn.cursor()
+def delete_income(income_id: int, user_id: Optional[int] = None) -> bool:
     try:
-        cur.execute("DELETE FROM incomes WHERE id=?", (income_id,))
-        conn.commit()
-        return True
+        return _delete_owned("incomes", income_id, user_id)
     except Exception as e:
         print("Delete income error:", e)
         return False
-    finally:
-        conn.close()
 
 # ---------- Budget ----------
 def get_monthly_budget(user_id: int) -> Optional[float]:
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute("SELECT monthly_budget FROM budgets WHERE user_id=?", (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    row = _cached_read(user_id, "SELECT monthly_budget FROM budgets WHERE user_id=?", (user_id,), fetch="one")
     return row[0] if row else None
 
 def set_budget(user_id: int, amount: float) -> bool:
-    conn = _conn()
-    cur = conn.cursor()
     try:
-        cur.execute("INSERT OR REPLACE INTO budgets (user_id, monthly_budget) VALUES (?,?)", (user_id, float(amount)))
-        conn.commit()
+        _write_for_user(user_id, lambda cur: cur.execute("INSERT OR REPLACE INTO budgets (user_id, monthly_budget) VALUES (?,?)", (user_id, float(amount))))
         return True
     except Exception as e:
         print("Set budget error:", e)
         return False
-    finally:
-        conn.close()
 
 # ---------- Recurring ----------
 def add_recurring_expense(category: str, amount: float, description: str, interval: str, user_id: int) -> bool:
-    conn = _conn()
-    cur = conn.cursor()
     try:
-        cur.execute(
+        _write_for_user(user_id, lambda cur: cur.execute(
             "INSERT INTO recurring_expenses (category, amount, description, interval, user_id) VALUES (?,?,?,?,?)",
             (category, float(amount), description, interval, user_id)
-        )
-        conn.commit()
+        ))
         return True
     except Exception as e:
         print("Add recurring error:", e)
         return False
-    finally:
-        conn.close()
 
 def fetch_recurring_expenses(user_id: int) -> List[Tuple]:
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute(
+    return _cached_read(
+        user_id,
         "SELECT id, category, amount, description, interval FROM recurring_expenses WHERE user_id=? ORDER BY id DESC",
         (user_id,)
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
 
-def delete_recurring_expense(rec_id: int) -> bool:
-    conn = _conn()
-    cur = conn.cursor()
+def delete_recurring_expense(rec_id: int, user_id: Optional[int] = None) -> bool:
     try:
-        cur.execute("DELETE FROM recurring_expenses WHERE id=?", (rec_id,))
-        conn.commit()
-        return True
+        return _delete_owned("recurring_expenses", rec_id, user_id)
     except Exception as e:
         print("Delete recurring error:", e)
         return False
-    finally:
-        conn.close()
 
 # ---------- Backup / Restore ----------
-def backup_db(dest_path: str) -> bool:
+# With user_id in tenant mode these copy just that user's file; without, DB_NAME.
+# Both go through SQLite's backup API: opening and closing the database file
+# directly would drop the POSIX locks this process's connections hold on it.
+# Core tables every backup has, whatever version of the app wrote it
+_BACKUP_TABLES = {"users", "expenses", "incomes", "budgets", "recurring_expenses"}
+
+def _open_source(src_path: str, only_user: Optional[int] = None) -> sqlite3.Connection:
+    # Read-only, so a missing source raises instead of being created empty.
+    # A tenant file may only receive its own user's rows: anything else would be
+    # counted again by readers that go through every tenant file
+    src = sqlite3.connect("file:" + pathname2url(os.path.abspath(src_path)) + "?mode=ro", uri=True)
+    try:
+        tables = {r[0] for r in src.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        missing = _BACKUP_TABLES - tables
+        if missing:
+            raise ValueError(f"{src_path} is not an expense database (missing {', '.join(sorted(missing))})")
+        if only_user is not None:
+            checks = [("users", "id")] + [(t, "user_id") for t, (_, cols) in CDC_TABLES.items() if "user_id" in cols]
+            for table, column in checks:
+                if src.execute(f"SELECT 1 FROM {table} WHERE {column} != ? LIMIT 1", (only_user,)).fetchone():
+                    raise ValueError(f"{src_path} holds other users' {table}; "
+                                     "it looks like a backup of the shared database, not of this user's file")
+    except Exception:
+        src.close()
+        raise
+    return src
+
+def _copy_db(src: sqlite3.Connection, dest_path: str):
+    dest = sqlite3.connect(dest_path)
     try:
-        shutil.copyfile(DB_NAME, dest_path)
+        src.backup(dest)
+    finally:
+        dest.close()
+        src.close()
+
+def backup_db(dest_path: str, user_id: Optional[int] = None) -> bool:
+    try:
+        source = db_path_for(user_id, create=True) if user_id is not None else DB_NAME
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        _copy_db(_open_source(source), dest_path)
         return True
     except Exception as e:
         print("Backup error:", e)
         return False
 
-def restore_db(src_path: str) -> bool:
+def restore_db(src_path: str, user_id: Optional[int] = None) -> bool:
+    tenant = user_id is not None and TENANT_DIR is not None
     try:
-        if os.path.exists(DB_NAME):
-            os.remove(DB_NAME)
-        shutil.copyfile(src_path, DB_NAME)
+        src = _open_source(src_path, user_id if tenant else None)
+        # Replaced in place under SQLite's locks, so open connections (the writers) stay valid
+        _copy_db(src, db_path_for(user_id, create=True) if user_id is not None else DB_NAME)
         return True
     except Exception as e:
         print("Restore error:", e)
         return False
+    finally:
+        if tenant:
+            _cache.bump(user_id)
+        else:
+            _cache.clear()
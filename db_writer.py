@@ -0,0 +1,128 @@
+# db_writer.py
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+# A write job receives the writer's cursor and returns any value for its Future.
+WriteJob = Callable[[sqlite3.Cursor], Any]
+
+_STOP = object()
+
+class WriteQueue:
+    """
+    Serializes all mutations through one dedicated connection.
+    Jobs queued within `window` seconds of each other are committed together
+    (group commit), so N concurrent writes cost one fsync instead of N.
+    Each job runs in its own SAVEPOINT: a failing job only rolls back itself.
+    """
+
+    def __init__(self, db_path: str, window: float = 0.005, max_batch: int = 256):
+        self.db_path = db_path
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0  # submitted and not yet committed (queued or in the current batch)
+        self._stats = {"jobs": 0, "failed_jobs": 0, "batches": 0, "last_batch_size": 0,
+                       "max_batch_size": 0, "max_queue_depth": 0, "commit_seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: WriteJob) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            self._pending += 1
+        self._queue.put((job, fut))
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+        return fut
+
+    def close(self, timeout: float = 5.0):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        s["queue_depth"] = self._queue.qsize()
+        s["avg_batch_size"] = (s["jobs"] / s["batches"]) if s["batches"] else 0.0
+        return s
+
+    # ---------- Writer thread ----------
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        # isolation_level=None: transactions are managed explicitly below
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        cur = conn.cursor()
+        stopping = False
+        while not stopping:
+            batch = self._collect(self._queue.get())
+            if batch[-1] is _STOP:
+                stopping = True
+                batch.pop()
+            if not batch:
+                continue
+            self._commit_batch(conn, cur, batch)
+        conn.close()
+
+    def _commit_batch(self, conn, cur, batch):
+        started = time.perf_counter()
+        outcomes = []
+        failed = 0
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for job, fut in batch:
+                cur.execute("SAVEPOINT job")
+                try:
+                    result = job(cur)
+                    cur.execute("RELEASE job")
+                    outcomes.append((fut, result, None))
+                except Exception as e:
+                    cur.execute("ROLLBACK TO job")
+                    cur.execute("RELEASE job")
+                    outcomes.append((fut, None, e))
+                    failed += 1
+            cur.execute("COMMIT")
+        except Exception as e:
+            # BEGIN/COMMIT itself failed (e.g. database is locked): fail the whole batch
+            if conn.in_transaction:
+                conn.rollback()
+            outcomes = [(fut, None, e) for _, fut in batch]
+            failed = len(batch)
+
+        with self._lock:
+            self._pending -= len(batch)
+            self._stats["jobs"] += len(batch)
+            self._stats["failed_jobs"] += failed
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+            self._stats["commit_seconds"] += time.perf_counter() - started
+
+        for fut, result, err in outcomes:
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(result)
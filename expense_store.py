@@ -0,0 +1,167 @@
+# expense_store.py
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from database import iter_expenses, insert_expense, delete_expense_from_db
+
+_INITIAL_CAPACITY = 64
+
+def _day_number(date_str: str) -> int:
+    # 'YYYY-MM-DD' -> days since 1970-01-01
+    return int(np.datetime64(date_str, "D").astype(np.int64))
+
+def _to_paise(amount) -> int:
+    return int(round(float(amount) * 100))
+
+class ExpenseStore:
+    """
+    One user's ledger held as NumPy columns for instant client-side slicing:
+    ids (int64), days since epoch (int32), category codes (int16), amounts in
+    paise (int64). Descriptions live in a separate string table.
+    Adds and deletes go to the database first, then update the columns in place.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.load()
+
+    # ---------- Loading ----------
+    def load(self):
+        # Streamed past the read cache: the columns are the only copy kept
+        self.categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        self._ids = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._days = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._cats = np.zeros(_INITIAL_CAPACITY, dtype=np.int16)
+        self._amounts = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._descriptions: List[str] = []
+        self._search_table: Optional[np.ndarray] = None
+        self._n = 0
+        for rows in iter_expenses(self.user_id):
+            lo, hi = self._n, self._n + len(rows)
+            while hi > len(self._ids):
+                self._grow()
+            ids, dates, cats, amounts, descs = zip(*rows)
+            self._ids[lo:hi] = ids
+            self._days[lo:hi] = np.array(dates, dtype="datetime64[D]").astype(np.int64)
+            self._cats[lo:hi] = [self._category_code(c) for c in cats]
+            self._amounts[lo:hi] = np.round(np.array(amounts, dtype=np.float64) * 100).astype(np.int64)
+            self._descriptions.extend(d or "" for d in descs)
+            self._n = hi
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self._category_codes[category] = code
+        return code
+
+    def __len__(self):
+        return self._n
+
+    # ---------- Incremental updates ----------
+    def add(self, date_str: str, category: str, amount, description: str) -> bool:
+        new_id = insert_expense(date_str, category, amount, description, self.user_id)
+        if new_id is None:
+            return False
+        if self._n == len(self._ids):
+            self._grow()
+        i = self._n
+        self._ids[i] = new_id
+        self._days[i] = _day_number(date_str)
+        self._cats[i] = self._category_code(category)
+        self._amounts[i] = _to_paise(amount)
+        self._descriptions.append(description or "")
+        self._search_table = None
+        self._n += 1
+        return True
+
+    def delete(self, expense_id: int) -> bool:
+        if not delete_expense_from_db(expense_id, self.user_id):
+            return False
+        hits = np.flatnonzero(self._ids[:self._n] == expense_id)
+        if hits.size:
+            i = int(hits[0])
+            n = self._n
+            for col in (self._ids, self._days, self._cats, self._amounts):
+                col[i:n - 1] = col[i + 1:n]
+            del self._descriptions[i]
+            self._search_table = None
+            self._n -= 1
+        return True
+
+    def _grow(self):
+        cap = len(self._ids) * 2
+        for name in ("_ids", "_days", "_cats", "_amounts"):
+            old = getattr(self, name)
+            new = np.zeros(cap, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    # ---------- Queries ----------
+    def mask(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+             category: Optional[str] = None, keyword: str = "") -> np.ndarray:
+        n = self._n
+        m = np.ones(n, dtype=bool)
+        days = self._days[:n]
+        if start_date:
+            m &= days >= _day_number(start_date)
+        if end_date:
+            m &= days <= _day_number(end_date)
+        if category and category != "All":
+            code = self._category_codes.get(category)
+            if code is None:
+                return np.zeros(n, dtype=bool)
+            m &= self._cats[:n] == code
+        if keyword:
+            if self._search_table is None:
+                self._search_table = np.array([d.lower() for d in self._descriptions], dtype=str) if n else np.array([], dtype=str)
+            m &= np.char.find(self._search_table, keyword.lower()) >= 0
+        return m
+
+    def order(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Positions of the (masked) rows, newest first like fetch_expenses."""
+        idx = np.arange(self._n) if mask is None else np.flatnonzero(mask)
+        return idx[np.lexsort((-self._ids[idx], -self._days[idx].astype(np.int64)))]
+
+    def row(self, i: int) -> Tuple:
+        """The row at position i as (id, date, category, amount, description)."""
+        return (int(self._ids[i]), str(self._days[i].astype("datetime64[D]")), self.categories[self._cats[i]],
+                int(self._amounts[i]) / 100, self._descriptions[i])
+
+    def rows(self, mask: Optional[np.ndarray] = None) -> List[Tuple]:
+        """Rows as (id, date, category, amount, description), newest first like fetch_expenses."""
+        order = self.order(mask)
+        dates = self._days[order].astype("datetime64[D]").astype(str)
+        amounts = self._amounts[order] / 100
+        return [
+            (int(self._ids[i]), d, self.categories[self._cats[i]], float(a), self._descriptions[i])
+            for i, d, a in zip(order, dates, amounts)
+        ]
+
+    def totals(self, month: str, year: str, mask: Optional[np.ndarray] = None) -> Tuple[float, float, Dict[str, float]]:
+        """
+        Totals for the month ('YYYY-MM') and year ('YYYY') and per-category totals
+        for the month, restricted to `mask` if given.
+        """
+        n = self._n
+        days = self._days[:n]
+        amounts = self._amounts[:n]
+        m = np.ones(n, dtype=bool) if mask is None else mask
+
+        month_start = np.datetime64(month, "M")
+        in_month = m & (days >= month_start.astype("datetime64[D]").astype(np.int64)) \
+                     & (days < (month_start + 1).astype("datetime64[D]").astype(np.int64))
+        year_start = np.datetime64(year, "Y")
+        in_year = m & (days >= year_start.astype("datetime64[D]").astype(np.int64)) \
+                    & (days < (year_start + 1).astype("datetime64[D]").astype(np.int64))
+
+        per_cat = np.bincount(self._cats[:n][in_month], weights=amounts[in_month], minlength=len(self.categories))
+        category_totals = {self.categories[c]: float(per_cat[c]) / 100 for c in np.flatnonzero(per_cat)}
+        return int(amounts[in_month].sum()) / 100, int(amounts[in_year].sum()) / 100, category_totals
+
+    def memory_bytes(self) -> int:
+        cols = sum(col.nbytes for col in (self._ids, self._days, self._cats, self._amounts))
+        strings = sum(len(d) for d in self._descriptions) + 8 * len(self._descriptions)
+        return cols + strings + sum(len(c) for c in self.categories)
@@ -0,0 +1,231 @@
+# export_columnar.py
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.request import pathname2url
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+import database
+from archive import archive_path, archived_years
+
+STATE_FILE = "_export_state.json"
+
+# Dates leave SQLite as days since epoch and amounts as integer paise, so every
+# column arrives already typed and no per-row Python conversion is needed.
+_QUERY = """
+SELECT id,
+       CAST(julianday(date) - 2440587.5 AS INTEGER) AS day,
+       category,
+       CAST(ROUND(amount * 100) AS INTEGER) AS amount_paise,
+       description,
+       user_id,
+       CAST(substr(date, 1, 4) AS INTEGER) AS year
+FROM expenses
+WHERE id > ?
+ORDER BY user_id, year, id
+"""
+
+def _schema(categories: pa.Array) -> pa.Schema:
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("category", pa.dictionary(pa.int32(), pa.string())),
+        ("amount_paise", pa.int64()),
+        ("description", pa.string()),
+    ], metadata={"categories": json.dumps(categories.to_pylist())})
+
+def _sources() -> List[Tuple[str, List[str]]]:
+    # Every data file (each tenant file in tenant mode) with its archives.
+    # Archives first so rows come out roughly oldest to newest
+    sources = []
+    for db_path in database.data_paths():
+        paths = [archive_path(y, db_path) for y in archived_years(db_path)]
+        sources.append((db_path, [p for p in paths if os.path.exists(p)] + [db_path]))
+    return sources
+
+def _connect(path: str, hot: bool) -> sqlite3.Connection:
+    if hot:
+        return sqlite3.connect(path)
+    return sqlite3.connect("file:" + pathname2url(path) + "?mode=ro", uri=True)
+
+def _load_state(root: str) -> Dict:
+    try:
+        with open(os.path.join(root, STATE_FILE)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"last_ids": {}, "runs": 0}
+    # Each data file has its own id space, so the last exported id is kept per
+    # file; older states had one last_id for the single database
+    if "last_ids" not in state:
+        state["last_ids"] = {os.path.abspath(database.DB_NAME): state.pop("last_id", 0)}
+    return state
+
+def _save_state(root: str, state: Dict):
+    tmp = os.path.join(root, STATE_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, os.path.join(root, STATE_FILE))
+
+# Parts are written under a hidden name (readers skip files starting with ".")
+# and only renamed into the dataset once the state recording them is saved, so
+# a failed run never leaves rows that the next incremental run writes again
+def _tmp_name(path: str) -> str:
+    head, tail = os.path.split(path)
+    return os.path.join(head, "." + tail + ".tmp")
+
+def _publish(root: str, state: Dict):
+    """Rename the parts the saved state lists as pending into the dataset."""
+    for rel in state.pop("pending", []):
+        path = os.path.join(root, rel)
+        if os.path.exists(_tmp_name(path)):
+            os.replace(_tmp_name(path), path)
+    _save_state(root, state)
+
+def _recover(root: str, state: Dict):
+    # A run that stopped after saving its state still owns its pending parts;
+    # any other hidden part is from a run that failed before that point
+    if state.get("pending"):
+        _publish(root, state)
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name.startswith(".part-") and name.endswith(".tmp"):
+                os.remove(os.path.join(dirpath, name))
+
+def _discard(files: List[str]):
+    for path in files:
+        try:
+            os.remove(_tmp_name(path))
+        except FileNotFoundError:
+            pass
+
+class _PartitionWriter:
+    """
+    Writes each (user_id, year) partition to root/user_id=U/year=Y/part-<run>.<ext>
+    (under its hidden temporary name until published). user_id and year live
+    only in the hive-style path, not in the files.
+    """
+
+    def __init__(self, root: str, fmt: str, schema: pa.Schema, run: str):
+        self.root, self.fmt, self.schema, self.run = root, fmt, schema, run
+        self._key: Optional[Tuple[int, int]] = None
+        self._writer = None
+        self._seen: Dict[Tuple[int, int], int] = {}
+        self.files: List[str] = []
+
+    def write(self, key: Tuple[int, int], batch: pa.RecordBatch):
+        if key != self._key:
+            self.close()
+            self._open(key)
+        self._writer.write_batch(batch)
+
+    def _open(self, key: Tuple[int, int]):
+        user_id, year = key
+        part_dir = os.path.join(self.root, f"user_id={user_id}", f"year={year}")
+        os.makedirs(part_dir, exist_ok=True)
+        n = self._seen.get(key, 0)
+        self._seen[key] = n + 1
+        suffix = f"-{n}" if n else ""
+        ext = "parquet" if self.fmt == "parquet" else "arrow"
+        path = os.path.join(part_dir, f"part-{self.run}{suffix}.{ext}")
+        self.files.append(path)
+        if self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(_tmp_name(path), self.schema, compression="zstd")
+        else:
+            self._writer = ipc.new_file(_tmp_name(path), self.schema)
+        self._key = key
+
+    def close(self):
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            finally:
+                self._writer = None
+                self._key = None
+
+def _categories(sources: List[Tuple[str, sqlite3.Connection, int]]) -> pa.Array:
+    # One dictionary for the whole run: Arrow IPC files cannot replace it mid-file
+    cats = set()
+    for _, conn, last_id in sources:
+        cats.update(r[0] for r in conn.execute("SELECT DISTINCT category FROM expenses WHERE id > ?", (last_id,)))
+    return pa.array(sorted(cats), type=pa.string())
+
+def export_expenses(root: str, fmt: str = "parquet", batch_size: int = 65536, incremental: bool = True) -> int:
+    """
+    Stream expenses (hot database and archives; every tenant file in tenant
+    mode) to a user/year partitioned Parquet or Arrow IPC dataset under root.
+    With incremental=True only rows added since the previous export are
+    written, as new part files.
+    Deletions are not propagated. Returns the number of rows written.
+    """
+    if fmt not in ("parquet", "arrow"):
+        raise ValueError(f"Unknown format: {fmt}")
+    os.makedirs(root, exist_ok=True)
+    state = _load_state(root)
+    _recover(root, state)
+    if not incremental:
+        state = {"last_ids": {}, "runs": 0}
+    last_ids = state["last_ids"]
+    run = datetime.now().strftime("%Y%m%dT%H%M%S") + f"-{state['runs']}"
+    conns: List[sqlite3.Connection] = []
+    sources: List[Tuple[str, sqlite3.Connection, int]] = []
+    writer = None
+    written = 0
+    max_ids = dict(last_ids)
+    try:
+        # Each source is read in one transaction, so the category scan and the
+        # data pass see the same rows; later commits wait for the next run
+        for db_path, paths in _sources():
+            key = os.path.abspath(db_path)
+            for path in paths:
+                conns.append(_connect(path, hot=path == db_path))
+                conns[-1].execute("BEGIN")
+                sources.append((key, conns[-1], last_ids.get(key, 0)))
+        categories = _categories(sources)
+        schema = _schema(categories)
+        writer = _PartitionWriter(root, fmt, schema, run)
+        for key, conn, last_id in sources:
+            cur = conn.execute(_QUERY, (last_id,))
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                ids, days, cats, amounts, descs, users, years = zip(*rows)
+                users_np = np.array(users, dtype=np.int64)
+                years_np = np.array(years, dtype=np.int64)
+                batch = pa.record_batch([
+                    pa.array(ids, type=pa.int64()),
+                    pa.array(np.array(days, dtype=np.int32), type=pa.date32()),
+                    pa.DictionaryArray.from_arrays(pc.index_in(pa.array(cats, type=pa.string()), value_set=categories), categories),
+                    pa.array(amounts, type=pa.int64()),
+                    pa.array(descs, type=pa.string()),
+                ], schema=schema)
+                # Rows are ordered by (user_id, year): split the batch where the partition changes
+                change = np.flatnonzero((np.diff(users_np) != 0) | (np.diff(years_np) != 0)) + 1
+                bounds = [0, *change.tolist(), len(rows)]
+                for lo, hi in zip(bounds, bounds[1:]):
+                    writer.write((int(users_np[lo]), int(years_np[lo])), batch.slice(lo, hi - lo))
+                written += len(rows)
+                max_ids[key] = max(max_ids.get(key, 0), max(ids))
+        writer.close()
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            _discard(writer.files)
+        raise
+    finally:
+        for conn in conns:
+            conn.close()
+
+    state = {"last_ids": max_ids, "runs": state["runs"] + 1,
+             "last_export": datetime.now().isoformat(timespec="seconds"), "format": fmt,
+             "pending": [os.path.relpath(p, root) for p in writer.files]}
+    _save_state(root, state)
+    _publish(root, state)
+    return written
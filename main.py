@@ -1,15 +1,142 @@
 # main.py
+import argparse
 import sys
-from PyQt6.QtWidgets import QApplication, QMessageBox
-from database import init_db
-from login import LoginWindow
+from database import init_db, start_writer
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Expense Tracker")
+    parser.add_argument("--db", default="expense.db", help="database file (default: expense.db)")
+    parser.add_argument("--tenant-dir", metavar="DIR",
+                        help="tenant mode: --db is the directory database, each user's data is a file in DIR")
+    parser.add_argument("--profile", nargs="?", const="expense_trace.json", metavar="TRACE",
+                        help="record phase timings and event-loop stalls to a Chrome trace file")
+    parser.add_argument("--profile-slots", default="", metavar="A,B",
+                        help="also run cProfile around these slots, saved as <trace>.prof (e.g. apply_filters,export_to_pdf)")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("archive", help="move a closed year into a sealed archive file")
+    p.add_argument("year", type=int)
+    p.add_argument("--user", type=int, help="tenant mode: only this user's file (default: every tenant file)")
+
+    p = sub.add_parser("backup-archives", help="copy changed archive files to a directory")
+    p.add_argument("dest")
+    p.add_argument("--user", type=int, help="tenant mode: only this user's archives (default: all)")
+
+    p = sub.add_parser("export-columnar", help="export expenses as a partitioned Parquet/Arrow dataset")
+    p.add_argument("dest")
+    p.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    p.add_argument("--full", action="store_true", help="export everything, not just rows added since the last export (use an empty dest)")
+
+    p = sub.add_parser("replicate", help="ship changes since the last run to a replica database")
+    p.add_argument("replica")
+
+    sub.add_parser("compact-log", help="drop change log entries all replicas have applied (every file in tenant mode)")
+
+    p = sub.add_parser("maintain", help="run integrity check, ANALYZE/optimize and incremental vacuum "
+                                        "(every file in tenant mode)")
+    p.add_argument("--budget", type=float, default=30.0, help="stop after this many seconds in total (default: 30)")
+    p.add_argument("--convert-auto-vacuum", action="store_true",
+                   help="switch an existing database to incremental auto-vacuum (runs a full VACUUM once)")
+
+    p = sub.add_parser("split-tenants", help="split the --db database into a directory database and per-user files")
+    p.add_argument("directory_db", help="new directory database (users and tenant paths)")
+    p.add_argument("tenant_dir", help="directory for the per-user database files")
+
+    p = sub.add_parser("analytics", help="run rolling averages, forecasts and outlier detection for all users")
+    p.add_argument("dest", help="directory for the CSV results")
+    return parser
+
+def run_command(args) -> int:
+    if args.command in ("archive", "backup-archives"):
+        import database
+        if args.user is not None and database.TENANT_DIR is None:
+            print("--user needs --tenant-dir; without it all users share one database")
+            return 1
+        # Each tenant file has its own archives
+        paths = database.data_paths(None if args.user is None else [args.user])
+        if not paths:
+            print(f"User {args.user} has no data file")
+            return 1
+        for path in paths:
+            where = f" in {path}" if database.TENANT_DIR else ""
+            if args.command == "archive":
+                from archive import archive_year
+                moved = archive_year(args.year, path)
+                print(f"Archived {moved} expenses from {args.year}{where}")
+            else:
+                from archive import backup_archives
+                copied = backup_archives(args.dest, path)
+                print(f"Copied {copied} archive file(s){where} to {args.dest}")
+    elif args.command == "export-columnar":
+        from export_columnar import export_expenses
+        written = export_expenses(args.dest, fmt=args.format, incremental=not args.full)
+        print(f"Exported {written} expenses to {args.dest}")
+    elif args.command == "replicate":
+        from replicate import replicate
+        result = replicate(args.replica)
+        action = "Seeded and updated" if result["seeded"] else "Updated"
+        print(f"{action} {args.replica}: {result['applied']} change(s), now at seq {result['last_seq']}")
+    elif args.command in ("compact-log", "maintain"):
+        import time
+        import database
+        # The directory database and every tenant file in tenant mode
+        paths = ([database.DB_NAME] if database.TENANT_DIR else []) + database.data_paths()
+        deadline = time.monotonic() + getattr(args, "budget", 0)
+        for path in paths:
+            where = f" in {path}" if database.TENANT_DIR else ""
+            if args.command == "compact-log":
+                from replicate import compact_change_log
+                print(f"Removed {compact_change_log(path)} change log entries{where}")
+            else:
+                from maintenance import run_maintenance
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"Maintenance: time budget used up, skipping {path}")
+                    continue
+                if where:
+                    print(f"Maintaining {path}")
+                run_maintenance(remaining, convert_auto_vacuum=args.convert_auto_vacuum, db_path=path)
+    elif args.command == "split-tenants":
+        from tenancy import split_shared_db
+        tenants = split_shared_db(args.directory_db, args.tenant_dir)
+        print(f"Split {len(tenants)} user(s) into {args.tenant_dir}; "
+              f"run with --db {args.directory_db} --tenant-dir {args.tenant_dir}")
+    elif args.command == "analytics":
+        import os
+        from analytics import run_nightly
+        os.makedirs(args.dest, exist_ok=True)
+        for name, df in run_nightly().items():
+            df.to_csv(os.path.join(args.dest, f"{name}.csv"), index=False)
+            print(f"{name}: {len(df)} rows")
+    return 0
 
 def main():
+    # Unknown arguments are left for Qt (e.g. -style)
+    args, _ = build_parser().parse_known_args()
+
+    if args.command:
+        if not init_db(args.db, args.tenant_dir):
+            print("Could not open or initialize database")
+            sys.exit(1)
+        sys.exit(run_command(args))
+
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+    from login import LoginWindow
+    import profiler
+
+    if args.profile:
+        profiler.enable(args.profile, [s for s in args.profile_slots.split(",") if s])
+    else:
+        profiler.enable_from_env()
+
     app = QApplication(sys.argv)
+    if profiler.active():
+        profiler.active().start_heartbeat()
 
-    if not init_db("expense.db"):
+    if not init_db(args.db, args.tenant_dir):
         QMessageBox.critical(None, "Error", "Could not open or initialize database")
         sys.exit(1)
+    start_writer()
 
     login = LoginWindow()
     login.show()
@@ -0,0 +1,202 @@
+# maintenance.py
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+
+import database
+from replicate import compact
+
+AUTO_VACUUM_INCREMENTAL = 2
+VACUUM_STEP_PAGES = 128
+ANALYSIS_LIMIT = 400        # rows sampled per index by ANALYZE; keeps it bounded
+BUSY_TIMEOUT = 0.1          # never wait long for a lock held by the writer
+PROGRESS_OPS = 1000         # VM instructions between checks for the deadline and waiting writes
+MAINTENANCE_INTERVAL = timedelta(hours=24)
+
+class Maintenance:
+    """
+    One maintenance pass split into short steps: quick_check, PRAGMA optimize,
+    change log compaction, bounded ANALYZE, incremental_vacuum in VACUUM_STEP_PAGES chunks, then the
+    maintenance_log entry. run(budget) performs steps until the time budget is
+    used and can be called again to resume. SQLite interrupts a running step at
+    the deadline or as soon as this process has writes waiting for the file;
+    a step that is interrupted or hits a lock is retried on the next call.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, convert_auto_vacuum: bool = False):
+        self.db_path = db_path or database.DB_NAME
+        self.convert_auto_vacuum = convert_auto_vacuum
+        self.report: Dict = {}
+        self.done = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._deadline = 0.0
+        self._steps = self._plan()
+        self._pending = None
+
+    def run(self, budget: float) -> bool:
+        """Run steps for up to `budget` seconds. Returns True once the pass is complete; never raises."""
+        self._deadline = time.monotonic() + budget
+        while not self.done and time.monotonic() < self._deadline:
+            try:
+                if self._pending is None:
+                    self._pending = next(self._steps)
+                # A step returns False when it wants to run again (incremental vacuum)
+                if self._pending() is not False:
+                    self._pending = None
+            except StopIteration:
+                self._finish()
+            except sqlite3.Error as e:
+                if any(s in str(e) for s in ("locked", "busy", "interrupted")):
+                    return False  # retry this step next time
+                print("Maintenance error:", e)
+                self._finish()
+        return self.done
+
+    def _yield_now(self) -> int:
+        # Progress handler: a non-zero result aborts the running statement
+        return int(time.monotonic() >= self._deadline or database.writes_pending(self.db_path))
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.set_progress_handler(self._yield_now, PROGRESS_OPS)
+        return self._conn
+
+    def _pragma(self, name: str) -> int:
+        return self._connection().execute(f"PRAGMA {name}").fetchone()[0]
+
+    def _plan(self) -> Iterator:
+        # Each yielded callable is one step; all database access happens inside steps
+        def before():
+            self.report.update(started=time.perf_counter(), started_at=datetime.now().isoformat(timespec="seconds"),
+                               pages_before=self._pragma("page_count"), freelist_before=self._pragma("freelist_count"),
+                               auto_vacuum=self._pragma("auto_vacuum"), steps={})
+        yield before
+
+        def timed(name, fn):
+            def step():
+                t = time.perf_counter()
+                result = fn()
+                # Attempts that were interrupted or locked out are not counted
+                self.report["steps"][name] = self.report["steps"].get(name, 0.0) + time.perf_counter() - t
+                return result
+            return step
+
+        def quick_check():
+            rows = self._connection().execute("PRAGMA quick_check").fetchall()
+            self.report["integrity"] = "; ".join(r[0] for r in rows)
+        yield timed("quick_check", quick_check)
+
+        yield timed("optimize", lambda: self._connection().execute("PRAGMA optimize"))
+
+        def compact_log():
+            # Log entries no replica still needs (all of them in tenant files)
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.report["log_entries_removed"] = compact(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                # An interrupted DELETE has already rolled the transaction back
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        yield timed("compact_log", compact_log)
+
+        def analyze():
+            conn = self._connection()
+            conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+            conn.execute("ANALYZE")
+        yield timed("analyze", analyze)
+
+        vacuum = self.report["auto_vacuum"] == AUTO_VACUUM_INCREMENTAL
+        if not vacuum and self.convert_auto_vacuum:
+            # Switching modes needs one full VACUUM; only done when asked for (CLI)
+            def convert():
+                conn = self._connection()
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+                self.report["auto_vacuum"] = self._pragma("auto_vacuum")
+            yield timed("convert_auto_vacuum", convert)
+            vacuum = True
+
+        if vacuum:
+            last_free = []
+            def vacuum_step():
+                free = self._pragma("freelist_count")
+                if free == 0 or (last_free and free >= last_free[-1]):
+                    return True
+                self._connection().execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+                last_free.append(free)
+                return False
+            yield timed("incremental_vacuum", vacuum_step)
+
+        def log():
+            r = self.report
+            r["seconds"] = time.perf_counter() - r["started"]
+            r["pages_after"] = self._pragma("page_count")
+            r["freelist_after"] = self._pragma("freelist_count")
+            self._connection().execute(
+                "INSERT INTO maintenance_log (started_at, finished_at, seconds, pages_before, pages_after, "
+                "freelist_before, freelist_after, integrity) VALUES (?,?,?,?,?,?,?,?)",
+                (r["started_at"], datetime.now().isoformat(timespec="seconds"), r["seconds"], r["pages_before"],
+                 r["pages_after"], r["freelist_before"], r["freelist_after"], r.get("integrity"))
+            )
+            r["logged"] = True
+        yield log
+
+    def _finish(self):
+        """End the pass (complete, failed or out of time) and release the connection."""
+        if self.done:
+            return
+        self.done = True
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        r = self.report
+        r.pop("started", None)
+        if not r.pop("logged", False):
+            return
+        steps = ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in r["steps"].items())
+        print(f"Maintenance: pages {r['pages_before']} -> {r['pages_after']}, "
+              f"free {r['freelist_before']} -> {r['freelist_after']}, "
+              f"integrity {r.get('integrity')}, {r['seconds']:.2f} s ({steps})")
+
+def last_run(db_path: Optional[str] = None) -> Optional[datetime]:
+    conn = sqlite3.connect(db_path or database.DB_NAME)
+    try:
+        row = conn.execute("SELECT MAX(finished_at) FROM maintenance_log").fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+    finally:
+        conn.close()
+
+def is_due(db_path: Optional[str] = None) -> bool:
+    last = last_run(db_path)
+    return last is None or datetime.now() - last >= MAINTENANCE_INTERVAL
+
+def _drive(m: Maintenance, budget: float) -> bool:
+    # Keep resuming the pass, pausing briefly whenever it yields, until done or out of budget
+    deadline = time.monotonic() + budget
+    while not m.run(max(deadline - time.monotonic(), 0)):
+        if time.monotonic() >= deadline:
+            m._finish()
+            return False
+        time.sleep(BUSY_TIMEOUT)
+    return True
+
+def run_maintenance(budget: float = 30.0, convert_auto_vacuum: bool = False, db_path: Optional[str] = None) -> Dict:
+    """Run a full pass over db_path (default DB_NAME) for the CLI, stopping after `budget` seconds of work."""
+    m = Maintenance(db_path, convert_auto_vacuum=convert_auto_vacuum)
+    if not _drive(m, budget):
+        print("Maintenance: time budget used up, stopping early")
+    return m.report
+
+def start_background_maintenance(db_path: Optional[str] = None, budget: float = 30.0) -> threading.Thread:
+    """Run a pass on a daemon thread (used by the GUI, so no step runs on the event loop)."""
+    m = Maintenance(db_path)
+    thread = threading.Thread(target=_drive, args=(m, budget), name="db-maintenance", daemon=True)
+    thread.start()
+    return thread
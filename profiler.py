@@ -0,0 +1,170 @@
+# profiler.py
+import atexit
+import cProfile
+import functools
+import inspect
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, List, Optional
+
+# EXPENSE_PROFILE=<trace.json> turns profiling on; EXPENSE_PROFILE_SLOTS=a,b
+# additionally runs cProfile around the named slots.
+PROFILE_ENV = "EXPENSE_PROFILE"
+PROFILE_SLOTS_ENV = "EXPENSE_PROFILE_SLOTS"
+# Heartbeat lag below this is timer jitter and recorded as 0
+LAG_FLOOR_MS = 5.0
+
+_active: Optional["Profiler"] = None
+
+class Profiler:
+    """
+    Collects phase timings and event-loop stalls as Chrome trace events
+    (viewable in Perfetto or chrome://tracing), plus optional cProfile stats
+    for selected slots (one profile for all of them, saved next to the trace).
+    """
+
+    def __init__(self, trace_path: str, slots: Iterable[str] = ()):
+        self.trace_path = trace_path
+        self.slots = set(slots)
+        self.events: List[Dict] = []
+        self._profile = cProfile.Profile()
+        self._profiling = False
+        self._profiled_calls = 0
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+        self._timer = None
+        self._last_beat = 0.0
+        self._last_lag = 0.0
+
+    def _us(self, t: float) -> float:
+        return (t - self._t0) * 1e6
+
+    def _emit(self, event: Dict):
+        event.setdefault("pid", self._pid)
+        event.setdefault("tid", threading.get_ident())
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def phase(self, name: str, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._emit({"name": name, "ph": "X", "ts": self._us(start), "dur": (end - start) * 1e6,
+                        "cat": "phase", "args": args})
+
+    @contextmanager
+    def cprofile(self, name: str):
+        # Only the outermost selected slot enables the profiler: a nested enable()
+        # replaces the running hook (3.11) or is refused (3.12+). Nested slots
+        # still show up in the stats as calls made under the outer one.
+        if self._profiling or not self._start_profile():
+            yield
+            return
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            self._profiling = False
+
+    def _start_profile(self) -> bool:
+        # Leave a profiler that is already running (e.g. python -m cProfile) alone
+        if sys.getprofile() is not None:
+            return False
+        try:
+            self._profile.enable()
+        except ValueError:
+            return False
+        self._profiling = True
+        self._profiled_calls += 1
+        return True
+
+    # ---------- Event loop ----------
+    def start_heartbeat(self, interval_ms: int = 50, stall_ms: int = 100):
+        """Report any gap between heartbeats longer than stall_ms as an event-loop stall."""
+        from PyQt6.QtCore import QTimer
+
+        self._last_beat = time.perf_counter()
+        self._timer = QTimer()
+        self._timer.timeout.connect(lambda: self._beat(time.perf_counter(), interval_ms, stall_ms))
+        self._timer.start(interval_ms)
+
+    def _beat(self, now: float, interval_ms: int, stall_ms: int):
+        gap_ms = (now - self._last_beat) * 1000
+        lag = gap_ms - interval_ms
+        lag = round(lag, 1) if lag >= LAG_FLOOR_MS else 0.0
+        # A counter keeps its value until the next sample, so an idle loop
+        # records nothing: only lag and the sample taking it back to 0
+        if lag or self._last_lag:
+            self._emit({"name": "event loop lag", "ph": "C", "ts": self._us(now), "args": {"ms": lag}})
+        self._last_lag = lag
+        if gap_ms >= stall_ms:
+            self._emit({"name": "event loop stall", "ph": "X", "ts": self._us(self._last_beat),
+                        "dur": (now - self._last_beat) * 1e6, "cat": "stall", "args": {"ms": round(gap_ms, 1)}})
+        self._last_beat = now
+
+    # ---------- Output ----------
+    def save(self):
+        with self._lock:
+            events = list(self.events)
+        events.append({"name": "process_name", "ph": "M", "pid": self._pid, "args": {"name": "Expense Tracker"}})
+        with open(self.trace_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        if self._profiled_calls:
+            pstats.Stats(self._profile).dump_stats(os.path.splitext(self.trace_path)[0] + ".prof")
+
+def enable(trace_path: str, slots: Iterable[str] = ()) -> Profiler:
+    global _active
+    _active = Profiler(trace_path, slots)
+    atexit.register(_active.save)
+    return _active
+
+def enable_from_env() -> Optional[Profiler]:
+    path = os.environ.get(PROFILE_ENV)
+    if not path:
+        return None
+    if path == "1":
+        path = "expense_trace.json"
+    slots = [s for s in os.environ.get(PROFILE_SLOTS_ENV, "").split(",") if s]
+    return enable(path, slots)
+
+def active() -> Optional[Profiler]:
+    return _active
+
+def phase(name: str, **args):
+    """Time a block as a trace phase; a no-op unless profiling is enabled."""
+    return _active.phase(name, **args) if _active else nullcontext()
+
+def profiled(func):
+    """
+    Record every call of a slot as a phase (and under cProfile if selected).
+    Extra signal arguments (e.g. clicked's `checked`) are dropped when the
+    slot does not take them, as PyQt would do for the undecorated method.
+    """
+    params = inspect.signature(func).parameters.values()
+    if any(p.kind == p.VAR_POSITIONAL for p in params):
+        max_args = None
+    else:
+        max_args = sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in params)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if max_args is not None:
+            args = args[:max_args]
+        if _active is None:
+            return func(*args, **kwargs)
+        name = func.__name__
+        with _active.phase(name):
+            if name in _active.slots:
+                with _active.cprofile(name):
+                    return func(*args, **kwargs)
+            return func(*args, **kwargs)
+    return wrapper
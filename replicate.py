@@ -0,0 +1,165 @@
+# replicate.py
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+
+import database
+from database import CDC_BLOB_COLUMNS, CDC_TABLES
+
+def _ensure_tables(conn: sqlite3.Connection):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS replicas (
+        path TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """)
+    # Entries up to compacted_through are gone; replicas behind it must be reseeded
+    conn.execute("CREATE TABLE IF NOT EXISTS change_log_meta (compacted_through INTEGER NOT NULL)")
+    if conn.execute("SELECT COUNT(*) FROM change_log_meta").fetchone()[0] == 0:
+        conn.execute("INSERT INTO change_log_meta VALUES (0)")
+
+def _replica_seq(path: str) -> int:
+    """Last applied sequence number of the replica, or -1 if it needs a full seed."""
+    if not os.path.exists(path):
+        return -1
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT last_seq FROM _replica_state").fetchone()
+        return row[0] if row else -1
+    except sqlite3.OperationalError:
+        return -1
+    finally:
+        conn.close()
+
+def _last_seq(conn: sqlite3.Connection) -> int:
+    # sqlite_sequence survives compaction emptying the log
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='change_log'").fetchone()
+    return row[0] if row else 0
+
+def _seed(primary: sqlite3.Connection, path: str) -> int:
+    # Hold a read transaction so the copy and the sequence number match
+    primary.execute("BEGIN")
+    try:
+        seq = _last_seq(primary)
+        if os.path.exists(path):
+            os.remove(path)
+        replica = sqlite3.connect(path)
+        try:
+            primary.backup(replica)
+            # The replica only applies changes; it must not log them again
+            for table in CDC_TABLES:
+                for op in ("ins", "upd", "del"):
+                    replica.execute(f"DROP TRIGGER IF EXISTS cdc_{table}_{op}")
+            replica.execute("DELETE FROM change_log")
+            replica.execute("CREATE TABLE _replica_state (last_seq INTEGER NOT NULL, updated_at TEXT NOT NULL)")
+            replica.execute("INSERT INTO _replica_state VALUES (?, ?)", (seq, datetime.now().isoformat(timespec="seconds")))
+            replica.commit()
+        finally:
+            replica.close()
+    finally:
+        primary.rollback()
+    return seq
+
+def _apply(primary: sqlite3.Connection, path: str, since: int) -> int:
+    changes = primary.execute(
+        "SELECT seq, tbl, op, row_key, row_image FROM change_log WHERE seq > ? ORDER BY seq", (since,)
+    ).fetchall()
+    if not changes:
+        return since
+    replica = sqlite3.connect(path)
+    try:
+        for seq, tbl, op, row_key, row_image in changes:
+            key, cols = CDC_TABLES[tbl]
+            if op == "D":
+                replica.execute(f"DELETE FROM {tbl} WHERE {key}=?", (row_key,))
+            else:
+                row = json.loads(row_image)
+                replica.execute(
+                    f"INSERT OR REPLACE INTO {tbl} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                    tuple(bytes.fromhex(row[c]) if c in CDC_BLOB_COLUMNS and row[c] is not None else row[c]
+                          for c in cols)
+                )
+        last = changes[-1][0]
+        replica.execute("UPDATE _replica_state SET last_seq=?, updated_at=?", (last, datetime.now().isoformat(timespec="seconds")))
+        replica.commit()
+    finally:
+        replica.close()
+    return last
+
+def replicate(replica_path: str) -> Dict[str, int]:
+    """
+    Bring replica_path up to date with the primary database by shipping only
+    change_log entries newer than the replica's last applied sequence number.
+    A missing or unusable replica is seeded with a full snapshot first.
+    """
+    replica_path = os.path.abspath(replica_path)
+    primary = sqlite3.connect(database.DB_NAME)
+    try:
+        _ensure_tables(primary)
+        primary.commit()
+        since = _replica_seq(replica_path)
+        compacted = primary.execute("SELECT compacted_through FROM change_log_meta").fetchone()[0]
+        last = _last_seq(primary)
+        # Reseed if the log no longer reaches back far enough, or the primary was restored
+        needs_seed = since < 0 or since < compacted or since > last
+        seeded = needs_seed
+        if needs_seed:
+            since = _seed(primary, replica_path)
+        new_seq = _apply(primary, replica_path, since)
+        primary.execute(
+            "INSERT OR REPLACE INTO replicas (path, last_seq, updated_at) VALUES (?,?,?)",
+            (replica_path, new_seq, datetime.now().isoformat(timespec="seconds"))
+        )
+        primary.commit()
+        return {"seeded": int(seeded), "applied": new_seq - since, "last_seq": new_seq}
+    finally:
+        primary.close()
+
+def forget_replica(replica_path: str) -> bool:
+    """Stop holding back compaction for a replica that is no longer used."""
+    conn = sqlite3.connect(database.DB_NAME)
+    try:
+        _ensure_tables(conn)
+        removed = conn.execute("DELETE FROM replicas WHERE path=?", (os.path.abspath(replica_path),)).rowcount
+        conn.commit()
+        return removed > 0
+    finally:
+        conn.close()
+
+def compact(conn: sqlite3.Connection) -> int:
+    """
+    Drop log entries every registered replica has applied, and superseded
+    entries (all but the newest per row) beyond that point: each entry carries
+    the full row image, so only the latest one matters. With no replica
+    registered the whole log goes: a new replica always starts from a snapshot.
+    Runs on the caller's connection and transaction. Returns rows removed.
+    """
+    _ensure_tables(conn)
+    if conn.execute("SELECT COUNT(*) FROM replicas").fetchone()[0] == 0:
+        last = _last_seq(conn)
+        conn.execute("UPDATE change_log_meta SET compacted_through=MAX(compacted_through, ?)", (last,))
+        return conn.execute("DELETE FROM change_log").rowcount
+    acked = conn.execute("SELECT MIN(last_seq) FROM replicas").fetchone()[0]
+    removed = conn.execute("DELETE FROM change_log WHERE seq <= ?", (acked,)).rowcount
+    conn.execute("UPDATE change_log_meta SET compacted_through=MAX(compacted_through, ?)", (acked,))
+    removed += conn.execute(
+        "DELETE FROM change_log WHERE seq NOT IN (SELECT MAX(seq) FROM change_log GROUP BY tbl, row_key)"
+    ).rowcount
+    return removed
+
+def compact_change_log(db_path: Optional[str] = None) -> int:
+    """
+    Compact the change log of db_path (default DB_NAME). Tenant files are never
+    replicated, so theirs is simply emptied; the maintenance pass does this for
+    every file it visits.
+    """
+    conn = sqlite3.connect(db_path or database.DB_NAME)
+    try:
+        removed = compact(conn)
+        conn.commit()
+        return removed
+    finally:
+        conn.close()
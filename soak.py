@@ -0,0 +1,268 @@
+# soak.py
+# Multi-process soak test of the data layer: N processes x T threads run a weighted
+# mix of real database calls against one database file for a fixed time, then
+# report throughput, latency percentiles, lock errors and final integrity.
+# Usage: python soak.py [--processes 4] [--threads 2] [--duration 30] [--db soak.db]
+#        [--mix add=50,fetch=35,budget=8,recurring=5,backup=2] [--no-writer] [--tenant-dir DIR]
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Dict, List
+
+import bcrypt
+import database
+
+CATEGORIES = ["Food", "Transportation", "Rent", "Shopping", "Entertainment", "Bills", "Other"]
+DEFAULT_MIX = "add=50,fetch=35,budget=8,recurring=5,backup=2"
+
+class _ErrorTap:
+    """
+    The database functions report failures by printing "<what> error: <e>".
+    This stdout wrapper counts those lines per operation (instead of printing
+    them) so lock errors show up in the report.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+
+    def write(self, text: str):
+        buf = getattr(self.local, "buf", "") + text
+        *lines, self.local.buf = buf.split("\n")
+        for line in lines:
+            if " error:" in line:
+                with self.lock:
+                    self.errors[getattr(self.local, "op", "?")][line.split(" error:", 1)[1].strip()] += 1
+            else:
+                self.stream.write(line + "\n")
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+# ---------- Operations ----------
+def _add(user_id: int, rnd: random.Random, ctx: Dict) -> bool:
+    day = date.today().replace(day=rnd.randint(1, 28)).isoformat()
+    ok = database.add_expense_to_db(day, rnd.choice(CATEGORIES), round(rnd.lognormvariate(5, 1), 2), "soak", user_id)
+    ctx["added"] += ok
+    return ok
+
+def _fetch(user_id: int, rnd: random.Random, ctx: Dict) -> bool:
+    database.fetch_expenses(user_id)
+    return True
+
+def _budget(user_id: int, rnd: random.Random, ctx: Dict) -> bool:
+    return database.set_budget(user_id, rnd.randrange(1000, 50000))
+
+def _recurring(user_id: int, rnd: random.Random, ctx: Dict) -> bool:
+    # Same reads and writes as ExpenseApp.apply_recurring_expenses (monthly items only)
+    month = date.today().isoformat()[:7]
+    existing = {(cat, desc or "") for _, dt, cat, _, desc in database.fetch_expenses(user_id) if dt[:7] == month}
+    ok = True
+    for _, category, amount, description, interval in database.fetch_recurring_expenses(user_id):
+        if interval == "Monthly" and (category, description or "") not in existing:
+            added = database.add_expense_to_db(date.today().isoformat(), category, amount, description, user_id)
+            ctx["added"] += added
+            ok = ok and added
+    return ok
+
+def _backup(user_id: int, rnd: random.Random, ctx: Dict) -> bool:
+    return database.backup_db(ctx["backup_path"], user_id if database.TENANT_DIR else None)
+
+OPERATIONS = {"add": _add, "fetch": _fetch, "budget": _budget, "recurring": _recurring, "backup": _backup}
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r} (choose from {', '.join(OPERATIONS)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+# ---------- Setup ----------
+def setup(db: str, users: int, tenant_dir=None):
+    """Fresh database with `users` users, each with a budget and a monthly recurring expense."""
+    for path in (db, db + "-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+    database.init_db(db, tenant_dir)
+    # Cheap hashes; login is not part of the soak
+    hashed = bcrypt.hashpw(b"soak", bcrypt.gensalt(rounds=4))
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO users (username, password) VALUES (?, ?)",
+                     [(f"soak{u}", hashed) for u in range(1, users + 1)])
+    conn.commit()
+    conn.close()
+    for u in range(1, users + 1):
+        database.set_budget(u, 20000)
+        database.add_recurring_expense("Bills", 999.0, "Soak subscription", "Monthly", u)
+
+def _expense_count() -> int:
+    total = 0
+    for path in database.data_paths():
+        conn = sqlite3.connect(path)
+        try:
+            total += conn.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+        finally:
+            conn.close()
+    return total
+
+# ---------- Workers ----------
+def _thread(mix: Dict[str, int], users: int, deadline: float, seed: int, ctx: Dict, tap: _ErrorTap, out: Dict):
+    # ctx is this thread's own: rows it added and its backup file
+    rnd = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    tap.local.buf = ""
+    while time.monotonic() < deadline:
+        name = rnd.choices(names, weights)[0]
+        tap.local.op = name
+        t = time.perf_counter()
+        try:
+            ok = OPERATIONS[name](rnd.randint(1, users), rnd, ctx)
+        except sqlite3.Error as e:
+            # Reads are not wrapped by the database module and raise directly
+            ok = False
+            with tap.lock:
+                tap.errors[name][str(e)] += 1
+        out[name].append(time.perf_counter() - t)
+        if not ok:
+            out["failed:" + name].append(0.0)
+
+def _process(config: Dict) -> Dict:
+    database.init_db(config["db"], config["tenant_dir"])
+    database.configure_read_cache(config["cache"])
+    if config["writer"]:
+        database.start_writer()
+    tap = _ErrorTap(sys.stdout)
+    sys.stdout = tap
+    # The clock starts once this worker is ready, not when it was spawned
+    deadline = time.monotonic() + config["duration"]
+    contexts = [{"added": 0, "backup_path": os.path.join(config["tmp"], f"backup_{os.getpid()}_{i}.db")}
+                for i in range(config["threads"])]
+    results: List[Dict] = []
+    threads = []
+    for i, ctx in enumerate(contexts):
+        out = defaultdict(list)
+        results.append(out)
+        threads.append(threading.Thread(target=_thread, args=(config["mix"], config["users"], deadline,
+                                                              config["seed"] * 1000 + i, ctx, tap, out)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    database.stop_writer()
+    sys.stdout = tap.stream
+
+    merged = defaultdict(list)
+    for out in results:
+        for name, values in out.items():
+            merged[name].extend(values)
+    return {"latencies": dict(merged), "errors": {k: dict(v) for k, v in tap.errors.items()},
+            "added": sum(ctx["added"] for ctx in contexts),
+            "torn_backups": sum(_torn(ctx["backup_path"]) for ctx in contexts)}
+
+def _torn(path: str) -> int:
+    # Sanity check of the online backup taken under concurrent writes; only the last one is checked
+    if not os.path.exists(path):
+        return 0
+    conn = sqlite3.connect(path)
+    try:
+        return int(conn.execute("PRAGMA quick_check").fetchone()[0] != "ok")
+    except sqlite3.DatabaseError:
+        return 1
+    finally:
+        conn.close()
+
+# ---------- Report ----------
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)] if sorted_values else 0.0
+
+def report(results: List[Dict], duration: float, expected: int, actual: int, integrity: str) -> bool:
+    latencies, errors = defaultdict(list), defaultdict(Counter)
+    for r in results:
+        for name, values in r["latencies"].items():
+            latencies[name].extend(values)
+        for name, counts in r["errors"].items():
+            errors[name].update(counts)
+
+    print(f"{'op':>10} {'count':>8} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'failed':>7} {'locked':>7}")
+    total = 0
+    for name in OPERATIONS:
+        values = sorted(latencies.get(name, []))
+        if not values:
+            continue
+        total += len(values)
+        locked = sum(n for msg, n in errors[name].items() if "locked" in msg or "busy" in msg)
+        print(f"{name:>10} {len(values):>8} {len(values) / duration:>9.1f} {_percentile(values, 0.5) * 1000:>9.2f} "
+              f"{_percentile(values, 0.99) * 1000:>9.2f} {values[-1] * 1000:>9.2f} "
+              f"{len(latencies.get('failed:' + name, [])):>7} {locked:>7}")
+    print(f"{'total':>10} {total:>8} {total / duration:>9.1f}")
+
+    for name, counts in errors.items():
+        for msg, n in counts.most_common():
+            print(f"  {name}: {n} x {msg}")
+    torn = sum(r["torn_backups"] for r in results)
+    print(f"Expenses: expected {expected}, found {actual}" + ("" if expected == actual else "  <-- MISMATCH"))
+    print(f"Backups failing quick_check: {torn}")
+    print(f"Integrity: {integrity}")
+    return expected == actual and integrity == "ok"
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process soak test of the expense database")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "expense_soak.db"))
+    parser.add_argument("--tenant-dir", help="run in tenant-per-file mode with files in this directory")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=2, help="threads per process")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--no-writer", dest="writer", action="store_false",
+                        help="write with a connection per call instead of the group-commit writer")
+    parser.add_argument("--cache", type=int, default=256, help="read cache entries per process (0 disables)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    if args.tenant_dir and os.path.isdir(args.tenant_dir) and os.listdir(args.tenant_dir):
+        parser.error(f"{args.tenant_dir} is not empty")
+    setup(args.db, args.users, args.tenant_dir)
+    before = _expense_count()
+
+    print(f"Soak: {args.processes} process(es) x {args.threads} thread(s), {args.duration:g} s, "
+          f"{args.users} users, writer {'on' if args.writer else 'off'}, mix {args.mix}")
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.monotonic()
+        configs = [{"db": args.db, "tenant_dir": args.tenant_dir, "cache": args.cache, "writer": args.writer,
+                    "mix": mix, "users": args.users, "threads": args.threads, "tmp": tmp,
+                    "duration": args.duration, "seed": args.seed + p} for p in range(args.processes)]
+        # Spawned workers start from a clean interpreter, as separate app instances would
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            results = pool.map(_process, configs)
+        elapsed = time.monotonic() - start
+
+    expected = before + sum(r["added"] for r in results)
+    integrity = []
+    for path in database.data_paths():
+        conn = sqlite3.connect(path)
+        try:
+            integrity.append(conn.execute("PRAGMA integrity_check").fetchone()[0])
+        finally:
+            conn.close()
+    ok = report(results, args.duration, expected, _expense_count(),
+                "ok" if all(r == "ok" for r in integrity) else "; ".join(integrity))
+    print(f"Wall time {elapsed:.1f} s")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# tenancy.py
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+
+import database
+from archive import archive_path, archive_year, archived_years
+from database import CDC_TABLES
+
+def _stored_path(path: str, directory_path: str) -> str:
+    # Same convention as database.db_path_for: relative to the directory database when below it
+    base = os.path.dirname(os.path.abspath(directory_path))
+    rel = os.path.relpath(os.path.abspath(path), base)
+    return os.path.abspath(path) if rel.startswith(os.pardir) else rel
+
+def split_shared_db(directory_path: str, tenant_dir: str, shared_path: Optional[str] = None) -> Dict[int, str]:
+    """
+    Split a shared database into a directory database (users and the tenants
+    table) plus one file per user under tenant_dir. Archived years are
+    re-archived per user. The shared database is only read. Open the result
+    with init_db(directory_path, tenant_dir). Returns user_id -> tenant file.
+    """
+    shared_path = shared_path or database.DB_NAME
+    if os.path.exists(directory_path):
+        raise ValueError(f"{directory_path} already exists")
+    os.makedirs(tenant_dir, exist_ok=True)
+    if not database.init_tenant_file(directory_path, directory=True):
+        raise RuntimeError(f"could not create {directory_path}")
+
+    src = sqlite3.connect(shared_path)
+    try:
+        users = [r[0] for r in src.execute("SELECT id FROM users ORDER BY id")]
+    finally:
+        src.close()
+    years = [y for y in archived_years(shared_path) if os.path.exists(archive_path(y, shared_path))]
+
+    directory = sqlite3.connect(directory_path)
+    try:
+        directory.execute("ATTACH DATABASE ? AS src", (shared_path,))
+        directory.execute("INSERT INTO main.users SELECT * FROM src.users")
+        directory.commit()
+        directory.execute("DETACH DATABASE src")
+
+        tenants = {}
+        for user_id in users:
+            path = os.path.join(tenant_dir, f"user_{user_id}.db")
+            _copy_user(shared_path, path, user_id, years)
+            directory.execute(
+                "INSERT INTO tenants (user_id, path, created_at) VALUES (?,?,?)",
+                (user_id, _stored_path(path, directory_path), datetime.now().isoformat(timespec="seconds"))
+            )
+            tenants[user_id] = path
+        directory.commit()
+        return tenants
+    finally:
+        directory.close()
+
+def _copy_user(shared_path: str, path: str, user_id: int, years) -> None:
+    if os.path.exists(path):
+        raise ValueError(f"{path} already exists")
+    if not database.init_tenant_file(path):
+        raise RuntimeError(f"could not create {path}")
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (shared_path,))
+        for table, (_, cols) in CDC_TABLES.items():
+            # users stay in the directory database
+            if "user_id" not in cols:
+                continue
+            columns = ", ".join(cols)
+            conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM src.{table} WHERE user_id=?",
+                         (user_id,))
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+
+        # Archived rows go back into the hot table first and are then sealed per user
+        archived = []
+        for y in years:
+            conn.execute("ATTACH DATABASE ? AS arc", (archive_path(y, shared_path),))
+            n = conn.execute(
+                "INSERT INTO main.expenses (id, date, category, amount, description, user_id) "
+                "SELECT id, date, category, amount, description, user_id FROM arc.expenses WHERE user_id=?",
+                (user_id,)
+            ).rowcount
+            conn.commit()
+            conn.execute("DETACH DATABASE arc")
+            if n:
+                archived.append(y)
+    finally:
+        conn.close()
+
+    for y in archived:
+        archive_year(y, path)
+
+    # A new file starts with an empty change log
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("DELETE FROM change_log")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name='change_log'")
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,18 @@
+# conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+@pytest.fixture
+def db(tmp_path):
+    """Fresh database in tmp_path; the writer and read cache are reset afterwards."""
+    path = str(tmp_path / "expense.db")
+    assert database.init_db(path)
+    yield path
+    database.stop_writer()
+    database.configure_read_cache()
@@ -0,0 +1,74 @@
+# test_analytics.py
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import database
+from analytics import detect_outliers, month_end_forecast, rolling_averages
+from archive import archive_year
+
+def test_each_series_starts_at_its_own_first_month():
+    monthly = pd.DataFrame({
+        "user_id": [1, 1, 1, 2],
+        "category": ["Food", "Food", "Rent", "Food"],
+        "month": ["2024-01", "2024-03", "2024-03", "2024-04"],
+        "total": [90.0, 30.0, 300.0, 40.0],
+    })
+    out = rolling_averages(monthly, windows=(3,))
+    rows = {(u, c, m): (t, a) for u, c, m, t, a in out.itertuples(index=False)}
+    assert rows == {
+        (1, "Food", "2024-01"): (90.0, 90.0),
+        (1, "Food", "2024-02"): (0.0, 45.0),
+        (1, "Food", "2024-03"): (30.0, 40.0),
+        (1, "Food", "2024-04"): (0.0, 10.0),
+        (1, "Rent", "2024-03"): (300.0, 300.0),
+        (1, "Rent", "2024-04"): (0.0, 150.0),
+        (2, "Food", "2024-04"): (40.0, 40.0),
+    }
+
+def _forecast(today):
+    return month_end_forecast([1], today=today).set_index("user_id").loc[1]
+
+def test_forecast_on_day_one_leans_on_the_baseline(db):
+    database.set_budget(1, 2000)
+    for day in ("2025-02-10", "2025-03-10", "2025-04-10"):
+        database.add_expense_to_db(day, "Food", 1000, "", 1)
+    database.add_expense_to_db("2025-05-01", "Food", 100, "", 1)
+    f = _forecast(date(2025, 5, 1))
+    weight = 1 / 31
+    rate = weight * 100 + (1 - weight) * 1000 / 31
+    assert (f["spent"], f["baseline"]) == (100, pytest.approx(1000))
+    assert f["forecast"] == pytest.approx(100 + rate * 30)
+    assert f["forecast_pct"] == pytest.approx(f["forecast"] / 2000 * 100)
+    assert not f["over_budget"]
+
+def test_forecast_without_baseline_extrapolates_the_pace(db):
+    database.set_budget(1, 500)
+    database.add_expense_to_db("2025-05-03", "Food", 150, "", 1)
+    database.add_expense_to_db("2025-05-10", "Rent", 50, "", 1)
+    database.add_expense_to_db("2025-05-20", "Rent", 999, "after today", 1)
+    f = _forecast(date(2025, 5, 10))
+    assert (f["spent"], f["baseline"]) == (200, 0)
+    assert f["forecast"] == pytest.approx(200 + 20 * 21)
+    assert f["forecast_pct"] == pytest.approx(124) and f["over_budget"]
+
+def test_january_forecast_reads_the_archived_baseline(db):
+    for day in ("2024-10-05", "2024-11-05", "2024-12-05"):
+        database.add_expense_to_db(day, "Food", 310, "", 1)
+    database.add_expense_to_db("2024-09-05", "Food", 9999, "outside the window", 1)
+    database.add_expense_to_db("2025-01-15", "Food", 150, "", 1)
+    assert archive_year(2024) == 4
+    f = _forecast(date(2025, 1, 15))
+    weight = 15 / 31
+    assert f["baseline"] == pytest.approx(310)
+    assert f["forecast"] == pytest.approx(150 + (weight * 10 + (1 - weight) * 10) * 16)
+    assert pd.isna(f["budget"]) and not f["over_budget"]
+
+def test_outliers_use_archived_history(db):
+    for i in range(10):
+        database.add_expense_to_db(f"2023-0{i % 9 + 1}-01", "Food", 100 + i, "", 1)
+    database.add_expense_to_db("2025-02-01", "Food", 5000, "feast", 1)
+    archive_year(2023)
+    assert detect_outliers([1])["amount"].tolist() == [5000]
+    assert detect_outliers([1], include_archives=False).empty
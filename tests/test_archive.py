@@ -0,0 +1,31 @@
+# test_archive.py
+import database
+from archive import archive_year, fetch_all_expenses
+
+def test_fetch_all_expenses_includes_archived_years(db):
+    database.create_user("user1", "pw")
+    for day in ("2020-03-01", "2021-07-15", "2025-01-02"):
+        database.add_expense_to_db(day, "Food", 10, day, 1)
+    database.add_expense_to_db("2020-05-05", "Rent", 99, "other user", 2)
+    before = fetch_all_expenses(1)
+
+    assert archive_year(2020) == 2
+    assert archive_year(2021) == 1
+    assert database.fetch_expenses(1) == [r for r in before if r[1] >= "2022"]
+    assert fetch_all_expenses(1) == before
+    assert [r[1] for r in fetch_all_expenses(1)] == ["2025-01-02", "2021-07-15", "2020-03-01"]
+
+def test_deleting_an_archived_expense_reports_failure(db):
+    from expense_store import ExpenseStore
+    database.create_user("user1", "pw")
+    database.add_expense_to_db("2020-03-01", "Food", 10, "old", 1)
+    database.add_expense_to_db("2025-01-02", "Food", 20, "new", 1)
+    archive_year(2020)
+    archived_id = fetch_all_expenses(1)[-1][0]
+    store = ExpenseStore(1)
+
+    assert database.delete_expense_from_db(archived_id, 1) is False
+    assert store.delete(archived_id) is False
+    assert len(fetch_all_expenses(1)) == 2
+    assert store.delete(store.rows()[0][0]) is True
+    assert database.fetch_expenses(1) == [] and len(store) == 0
@@ -0,0 +1,62 @@
+# test_cashflow.py
+import random
+from collections import defaultdict
+
+import pytest
+
+import database
+from archive import archive_year
+from cashflow import cash_flow
+
+def _reference(incomes, expenses):
+    months = defaultdict(lambda: [0.0, 0.0])
+    for day, amount in incomes:
+        months[day[:7]][0] += amount
+    for day, amount in expenses:
+        months[day[:7]][1] += amount
+    rows, balance = [], 0.0
+    for month in sorted(months):
+        income, expense = months[month]
+        balance += income - expense
+        rows.append((month, income, expense, income - expense, balance))
+    return rows
+
+def _assert_rows(actual, expected):
+    assert [r[0] for r in actual] == [r[0] for r in expected]
+    for a, e in zip(actual, expected):
+        assert a[1:] == pytest.approx(e[1:])
+
+def test_running_balance_matches_python_over_hot_and_archived_years(db):
+    rnd = random.Random(5)
+    incomes, expenses = [], []
+    for _ in range(400):
+        day = f"{rnd.randrange(2018, 2026)}-{rnd.randrange(1, 13):02d}-{rnd.randrange(1, 29):02d}"
+        amount = round(rnd.uniform(1, 900), 2)
+        if rnd.random() < 0.3:
+            assert database.add_income(day, "Salary", amount, "", 1)
+            incomes.append((day, amount))
+        else:
+            assert database.add_expense_to_db(day, "Food", amount, "", 1)
+            expenses.append((day, amount))
+        # Another user's rows must not leak in
+        database.add_expense_to_db(day, "Food", 1000, "", 2)
+    expected = _reference(incomes, expenses)
+    _assert_rows(cash_flow(1), expected)
+
+    for year in range(2018, 2024):
+        archive_year(year)
+    assert not [r for r in database.fetch_expenses(1) if r[1] < "2024"]
+    _assert_rows(cash_flow(1), expected)
+    database.configure_read_cache(0)
+    _assert_rows(cash_flow(1), expected)
+
+def test_add_income_invalidates_the_cached_statement(db):
+    database.add_expense_to_db("2025-03-01", "Food", 40, "", 1)
+    first = cash_flow(1)
+    assert first == [("2025-03", 0.0, 40.0, -40.0, -40.0)]
+    assert cash_flow(1) == first
+    assert database.add_income("2025-02-01", "Salary", 100, "", 1)
+    assert cash_flow(1) == [("2025-02", 100.0, 0.0, 100.0, 100.0), ("2025-03", 0.0, 40.0, -40.0, 60.0)]
+    # Another user's income leaves this user's statement as it was
+    assert database.add_income("2025-02-01", "Salary", 999, "", 2)
+    assert cash_flow(1)[-1][-1] == 60.0
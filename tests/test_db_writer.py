@@ -0,0 +1,103 @@
+# test_db_writer.py
+import sqlite3
+import threading
+
+import pytest
+
+import db_writer
+from db_writer import WriteQueue
+
+@pytest.fixture
+def path(tmp_path):
+    p = str(tmp_path / "w.db")
+    conn = sqlite3.connect(p)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT UNIQUE)")
+    conn.close()
+    return p
+
+def _values(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(r[0] for r in conn.execute("SELECT v FROM t"))
+    finally:
+        conn.close()
+
+def _insert(v):
+    return lambda cur: cur.execute("INSERT INTO t (v) VALUES (?)", (v,)).lastrowid
+
+def test_jobs_within_the_window_commit_together(path):
+    q = WriteQueue(path, window=0.5)
+    try:
+        futures = [q.submit(_insert(str(i))) for i in range(5)]
+        assert [f.result(5) for f in futures] == [1, 2, 3, 4, 5]
+        s = q.stats()
+        assert (s["jobs"], s["batches"], s["last_batch_size"], s["max_batch_size"]) == (5, 1, 5, 5)
+        assert s["avg_batch_size"] == 5.0 and s["failed_jobs"] == 0 and s["commit_seconds"] > 0
+        assert s["max_queue_depth"] >= 1 and s["queue_depth"] == 0
+    finally:
+        q.close()
+    assert _values(path) == ["0", "1", "2", "3", "4"]
+
+def test_failing_job_rolls_back_only_itself(path):
+    def bad(cur):
+        cur.execute("INSERT INTO t (v) VALUES ('partial')")
+        raise ValueError("boom")
+    q = WriteQueue(path, window=0.5)
+    try:
+        futures = [q.submit(_insert("a")), q.submit(bad), q.submit(_insert("a")), q.submit(_insert("b"))]
+        assert futures[0].result(5) == 1
+        with pytest.raises(ValueError):
+            futures[1].result(5)
+        with pytest.raises(sqlite3.IntegrityError):
+            futures[2].result(5)
+        assert futures[3].result(5) == 2
+        assert (q.stats()["batches"], q.stats()["failed_jobs"]) == (1, 2)
+    finally:
+        q.close()
+    assert _values(path) == ["a", "b"]
+
+def test_failed_begin_fails_every_future_and_the_writer_recovers(path, monkeypatch):
+    connect = sqlite3.connect
+    monkeypatch.setattr(db_writer.sqlite3, "connect", lambda *a, **k: connect(*a, timeout=0.1, **k))
+    blocker = connect(path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+    q = WriteQueue(path, window=0.2)
+    try:
+        futures = [q.submit(_insert(str(i))) for i in range(3)]
+        for f in futures:
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                f.result(5)
+        assert q.stats()["failed_jobs"] == 3 and q.pending() == 0
+        blocker.execute("ROLLBACK")
+        assert q.submit(_insert("after")).result(5) == 1
+    finally:
+        blocker.close()
+        q.close()
+    assert _values(path) == ["after"]
+
+def test_pending_counts_jobs_until_their_batch_commits(path):
+    started, release = threading.Event(), threading.Event()
+    def slow(cur):
+        started.set()
+        release.wait(5)
+        return _insert("slow")(cur)
+    q = WriteQueue(path, window=0.0)
+    try:
+        assert q.pending() == 0
+        first = q.submit(slow)
+        assert started.wait(5)
+        second = q.submit(_insert("next"))
+        assert q.pending() == 2
+        release.set()
+        first.result(5), second.result(5)
+        assert q.pending() == 0
+        assert q.stats()["jobs"] == 2
+    finally:
+        q.close()
+
+def test_close_commits_queued_jobs(path):
+    q = WriteQueue(path, window=0.5)
+    futures = [q.submit(_insert(str(i))) for i in range(3)]
+    q.close()
+    assert all(f.done() for f in futures)
+    assert _values(path) == ["0", "1", "2"]
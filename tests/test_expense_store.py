@@ -0,0 +1,98 @@
+# test_expense_store.py
+import random
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+import database
+from expense_store import ExpenseStore
+
+CATEGORIES = ["Food", "Rent", "Bills", "Other"]
+WORDS = ["Lunch", "bus", "Rent", "gift", ""]
+
+def _fill(n, seed=7):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        day = (date(2023, 1, 1) + timedelta(days=rnd.randrange(900))).isoformat()
+        database.add_expense_to_db(day, rnd.choice(CATEGORIES), round(rnd.uniform(1, 500), 2),
+                                   f"{rnd.choice(WORDS)} {rnd.randrange(50)}".strip(), 1)
+
+# The tuple loop the store replaced
+def _reference_rows(start=None, end=None, category=None, keyword=""):
+    rows = []
+    for r in database.fetch_expenses(1):
+        if start and r[1] < start or end and r[1] > end:
+            continue
+        if category and category != "All" and r[2] != category:
+            continue
+        if keyword and keyword.lower() not in (r[4] or "").lower():
+            continue
+        rows.append(r)
+    return rows
+
+def _reference_totals(rows, month, year):
+    in_month = [r for r in rows if r[1][:7] == month]
+    per_cat = {}
+    for r in in_month:
+        per_cat[r[2]] = per_cat.get(r[2], 0) + r[3]
+    return sum(r[3] for r in in_month), sum(r[3] for r in rows if r[1][:4] == year), per_cat
+
+@pytest.mark.parametrize("filters", [
+    {}, {"start": "2023-06-01", "end": "2024-02-29"}, {"category": "Rent"}, {"keyword": "LUNCH"},
+    {"start": "2024-01-01", "category": "Food", "keyword": "1"}, {"category": "Missing"}, {"category": "All"},
+])
+def test_mask_rows_and_totals_match_the_tuple_loop(db, filters):
+    _fill(300)
+    store = ExpenseStore(1)
+    expected = _reference_rows(**filters)
+    mask = store.mask(filters.get("start"), filters.get("end"), filters.get("category"), filters.get("keyword", ""))
+    assert store.rows(mask) == expected
+    assert [store.row(i) for i in store.order(mask)] == expected
+    for month, year in (("2024-03", "2024"), ("2023-12", "2023"), ("2030-01", "2030")):
+        month_total, year_total, per_cat = store.totals(month, year, mask)
+        ref_month, ref_year, ref_cat = _reference_totals(expected, month, year)
+        assert month_total == pytest.approx(ref_month) and year_total == pytest.approx(ref_year)
+        assert per_cat.keys() == ref_cat.keys()
+        assert all(per_cat[c] == pytest.approx(ref_cat[c]) for c in ref_cat)
+
+def test_add_delete_and_grow_track_the_database(db):
+    _fill(10)
+    store = ExpenseStore(1)
+    rnd = random.Random(3)
+    for i in range(150):  # past the initial capacity of 64
+        assert store.add(f"2025-0{rnd.randrange(1, 10)}-1{rnd.randrange(10)}", rnd.choice(CATEGORIES + ["New"]),
+                         f"{rnd.uniform(1, 99):.2f}", f"added {i}")
+    for expense_id in rnd.sample([r[0] for r in store.rows()], 40):
+        assert store.delete(expense_id)
+    assert len(store) == 120
+    assert store.rows() == database.fetch_expenses(1)
+    assert store.rows(store.mask(keyword="ADDED 1")) == _reference_rows(keyword="added 1")
+    store.load()
+    assert store.rows() == database.fetch_expenses(1)
+
+def test_load_bypasses_the_read_cache_and_stays_small(db):
+    _fill(2000)
+    database.clear_read_cache()
+    store = ExpenseStore(1)
+    assert len(store) == 2000
+    assert not database._cache._entries
+    rows = database.fetch_expenses(1)
+    tuples = sys.getsizeof(rows) + sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r) for r in rows)
+    assert store.memory_bytes() < tuples / 4
+
+def test_table_model_reads_rows_from_the_store(db):
+    pytest.importorskip("PyQt6")
+    from app import ExpenseTableModel
+    _fill(50)
+    store = ExpenseStore(1)
+    model = ExpenseTableModel(store)
+    assert model.rowCount() == 0
+    archived = [(9999, "2019-05-01", "Food", 12.5, "old")]
+    mask = store.mask(category="Food")
+    model.set_rows(mask, archived)
+    expected = store.rows(mask) + archived
+    assert (model.rowCount(), model.columnCount()) == (len(expected), 5)
+    assert [model.row(r) for r in range(model.rowCount())] == expected
+    assert model.data(model.index(len(expected) - 1, 4)) == "old"
+    assert model.data(model.index(0, 3)) == str(expected[0][3])
@@ -0,0 +1,94 @@
+# test_export_columnar.py
+import os
+
+import pyarrow.dataset as ds
+import pytest
+
+import database
+import export_columnar
+
+def _ids(root):
+    return sorted(ds.dataset(root, format="parquet", partitioning="hive").to_table(columns=["id"])["id"].to_pylist())
+
+def test_failed_export_leaves_no_rows_behind(db, tmp_path, monkeypatch):
+    root = str(tmp_path / "dataset")
+    for u in (1, 2):
+        for day in ("2024-03-01", "2025-07-15"):
+            database.add_expense_to_db(day, "Food", 10, "x", u)
+    assert export_columnar.export_expenses(root) == 4
+
+    for u in (1, 2, 3):
+        database.add_expense_to_db("2025-08-01", "Rent", 5, "y", u)
+    real_write = export_columnar._PartitionWriter.write
+    def failing_write(self, key, batch):
+        if key[0] == 3:
+            raise OSError("disk full")
+        real_write(self, key, batch)
+    monkeypatch.setattr(export_columnar._PartitionWriter, "write", failing_write)
+    with pytest.raises(OSError):
+        export_columnar.export_expenses(root, batch_size=1)
+    assert _ids(root) == [1, 2, 3, 4]
+    assert not [n for _, _, names in os.walk(root) for n in names if n.endswith(".tmp")]
+
+    monkeypatch.undo()
+    assert export_columnar.export_expenses(root) == 3
+    assert _ids(root) == [1, 2, 3, 4, 5, 6, 7]
+
+def test_parts_pending_in_saved_state_are_published(db, tmp_path, monkeypatch):
+    root = str(tmp_path / "dataset")
+    database.add_expense_to_db("2025-01-01", "Food", 10, "x", 1)
+    # Stop right after the state is saved, before the parts are renamed
+    monkeypatch.setattr(export_columnar, "_publish", lambda root, state: None)
+    assert export_columnar.export_expenses(root) == 1
+    monkeypatch.undo()
+
+    database.add_expense_to_db("2025-01-02", "Food", 10, "x", 1)
+    assert export_columnar.export_expenses(root) == 1
+    assert _ids(root) == [1, 2]
+
+def test_category_committed_during_an_export_is_not_lost(db, tmp_path, monkeypatch):
+    import threading
+    root = str(tmp_path / "dataset")
+    database.add_expense_to_db("2025-01-01", "Food", 10, "x", 1)
+    real_categories = export_columnar._categories
+    writes = []
+    def categories_then_write(sources):
+        cats = real_categories(sources)
+        # Another writer commits a new category between the category scan and the data pass
+        writes.append(threading.Thread(target=database.add_expense_to_db, args=("2025-01-02", "Pets", 5, "y", 1)))
+        writes[0].start()
+        writes[0].join(0.5)
+        return cats
+    monkeypatch.setattr(export_columnar, "_categories", categories_then_write)
+    export_columnar.export_expenses(root)
+    monkeypatch.undo()
+    writes[0].join()
+    export_columnar.export_expenses(root)
+
+    table = ds.dataset(root, format="parquet", partitioning="hive").to_table()
+    rows = sorted(zip(table["id"].to_pylist(), table["category"].to_pylist()))
+    assert rows == [(1, "Food"), (2, "Pets")]
+
+def test_tenant_files_export_with_their_own_last_ids(tmp_path):
+    root = str(tmp_path / "dataset")
+    assert database.init_db(str(tmp_path / "dir.db"), str(tmp_path / "tenants"))
+    for user in (1, 2):
+        database.create_user(f"user{user}", "pw")
+        database.add_expense_to_db("2025-01-01", "Food", 10, "x", user)
+    # Both files start their ids at 1
+    assert export_columnar.export_expenses(root) == 2
+    database.add_expense_to_db("2025-01-02", "Rent", 20, "y", 2)
+    assert export_columnar.export_expenses(root) == 1
+    table = ds.dataset(root, format="parquet", partitioning="hive").to_table()
+    assert sorted(zip(table["user_id"].to_pylist(), table["id"].to_pylist())) == [(1, 1), (2, 1), (2, 2)]
+
+def test_state_with_a_single_last_id_still_applies(db, tmp_path):
+    import json
+    root = str(tmp_path / "dataset")
+    for i in range(3):
+        database.add_expense_to_db("2025-01-01", "Food", 10, "x", 1)
+    os.makedirs(root)
+    with open(os.path.join(root, export_columnar.STATE_FILE), "w") as f:
+        json.dump({"last_id": 2, "runs": 1}, f)
+    assert export_columnar.export_expenses(root) == 1
+    assert _ids(root) == [3]
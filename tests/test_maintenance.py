@@ -0,0 +1,64 @@
+# test_maintenance.py
+import sqlite3
+
+import database
+import maintenance
+
+def _fill(db, rows=5000):
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO expenses (date, category, amount, description, user_id) VALUES ('2025-01-01', 'Food', 1, ?, 1)",
+                     [("x" * 200,)] * rows)
+    conn.execute("DELETE FROM expenses WHERE id % 2 = 0")
+    conn.commit()
+    conn.close()
+
+def test_locked_steps_are_retried_not_raised(db):
+    _fill(db)
+    m = maintenance.Maintenance(db)
+    blocker = sqlite3.connect(db, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        for _ in range(20):  # ANALYZE needs the write lock
+            assert m.run(0.05) is False
+    finally:
+        blocker.execute("COMMIT")
+        blocker.close()
+    while not m.run(0.05):
+        pass
+    assert m.report["integrity"] == "ok"
+    assert m.report["freelist_after"] == 0
+    assert maintenance.last_run(db) is not None
+
+def test_locked_log_insert_is_retried(db):
+    m = maintenance.Maintenance(db)
+    blocker = sqlite3.connect(db, isolation_level=None)
+    blocked = []
+
+    def take_lock_before_log(sql):
+        if sql.startswith("INSERT INTO maintenance_log") and not blocked:
+            blocked.append(sql)
+            blocker.execute("BEGIN IMMEDIATE")
+    m._connection().set_trace_callback(take_lock_before_log)
+
+    assert m.run(5) is False
+    assert blocked and not m.done
+    blocker.execute("COMMIT")
+    blocker.close()
+    assert m.run(5) is True
+    assert maintenance.last_run(db) is not None
+
+def test_run_stops_at_the_deadline(db):
+    _fill(db, 20000)
+    m = maintenance.Maintenance(db)
+    assert m.run(0.0) is False
+    assert not m.done
+
+def test_background_pass_yields_to_writes(db):
+    _fill(db)
+    database.start_writer()
+    thread = maintenance.start_background_maintenance(db)
+    for i in range(100):
+        assert database.add_expense_to_db("2025-02-01", "Food", i, "", 1)
+    thread.join(30)
+    assert not thread.is_alive()
+    assert not maintenance.is_due(db)
@@ -0,0 +1,56 @@
+# test_profiler.py
+import cProfile
+import pstats
+
+import profiler
+from profiler import profiled
+
+def _after_inner():
+    return sum(range(1000))
+
+@profiled
+def inner():
+    return sum(range(100))
+
+@profiled
+def outer():
+    inner()
+    return _after_inner()
+
+def _functions(prof):
+    return {name: stats[1] for (_, _, name), stats in pstats.Stats(prof).stats.items()}
+
+def test_nested_slots_share_one_profile(tmp_path, monkeypatch):
+    p = profiler.Profiler(str(tmp_path / "trace.json"), ["outer", "inner"])
+    monkeypatch.setattr(profiler, "_active", p)
+    outer()
+    outer()
+    calls = _functions(p._profile)
+    assert calls["outer"] == 2 and calls["inner"] == 2 and calls["_after_inner"] == 2
+    assert [e["name"] for e in p.events].count("inner") == 2
+    p.save()
+    assert (tmp_path / "trace.prof").exists()
+
+def test_a_running_profiler_is_left_alone(tmp_path, monkeypatch):
+    p = profiler.Profiler(str(tmp_path / "trace.json"), ["outer"])
+    monkeypatch.setattr(profiler, "_active", p)
+    external = cProfile.Profile()
+    external.enable()
+    try:
+        assert outer() == sum(range(1000))
+    finally:
+        external.disable()
+    assert "_after_inner" in _functions(external)
+    p.save()
+    assert not (tmp_path / "trace.prof").exists()
+
+def test_heartbeat_records_lag_only_while_there_is_some(tmp_path):
+    p = profiler.Profiler(str(tmp_path / "trace.json"))
+    t = 0.0
+    for gap_ms in [50, 51, 52, 50, 180, 70, 50, 49, 50] + [50] * 100:
+        t += gap_ms / 1000
+        p._beat(t, 50, 100)
+    lag = [e["args"]["ms"] for e in p.events if e["name"] == "event loop lag"]
+    stalls = [e["args"]["ms"] for e in p.events if e["name"] == "event loop stall"]
+    assert lag == [130.0, 20.0, 0.0]
+    assert stalls == [180.0]
@@ -0,0 +1,101 @@
+# test_read_cache.py
+import multiprocessing
+import random
+import sqlite3
+
+import pytest
+
+import database
+
+USERS = (1, 2, 3)
+
+def _uncached(fn, *args):
+    # Same call with the cache switched off, then the original cache put back
+    saved = database._cache
+    database.configure_read_cache(0)
+    try:
+        return fn(*args)
+    finally:
+        database._cache = saved
+
+def _reads(user_id):
+    return [
+        (database.fetch_expenses, user_id),
+        (database.fetch_incomes, user_id),
+        (database.get_monthly_budget, user_id),
+        (database.fetch_recurring_expenses, user_id),
+    ]
+
+def _random_write(rnd, user_id):
+    op = rnd.randrange(7)
+    day = f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+    if op == 0:
+        database.add_expense_to_db(day, rnd.choice(["Food", "Rent"]), rnd.randint(1, 999), "t", user_id)
+    elif op == 1:
+        database.add_income(day, "Salary", rnd.randint(1, 999), "", user_id)
+    elif op == 2:
+        database.set_budget(user_id, rnd.randint(100, 9999))
+    elif op == 3:
+        database.add_recurring_expense("Bills", rnd.randint(1, 99), "r", "Monthly", user_id)
+    elif op == 4:
+        rows = database.fetch_expenses(user_id)
+        if rows:
+            database.delete_expense_from_db(rnd.choice(rows)[0], user_id)
+    elif op == 5:
+        rows = database.fetch_incomes(user_id)
+        if rows:
+            database.delete_income(rnd.choice(rows)[0], user_id)
+    else:
+        rows = database.fetch_recurring_expenses(user_id)
+        if rows:
+            database.delete_recurring_expense(rnd.choice(rows)[0], user_id)
+
+def _external_write(path, user_id, amount):
+    # Runs in a separate process with its own (empty) cache
+    database.init_db(path)
+    database.add_expense_to_db("2025-06-01", "Food", amount, "other process", user_id)
+
+def _assert_matches(user_id):
+    for fn, arg in _reads(user_id):
+        assert fn(arg) == _uncached(fn, arg), fn.__name__
+
+@pytest.mark.parametrize("writer", [False, True])
+def test_cached_reads_match_uncached(db, writer):
+    if writer:
+        database.start_writer()
+    for u in USERS:
+        assert database.create_user(f"user{u}", "pw")
+    rnd = random.Random(1234)
+    for _ in range(400):
+        _random_write(rnd, rnd.choice(USERS))
+        for u in rnd.sample(USERS, 2):
+            _assert_matches(u)
+    assert database.read_cache_stats()["hits"] > 0
+
+def test_cache_sees_writes_from_other_connections(db):
+    database.create_user("user1", "pw")
+    database.add_expense_to_db("2025-01-01", "Food", 10, "", 1)
+    assert len(database.fetch_expenses(1)) == 1
+    assert len(database.fetch_expenses(1)) == 1  # now cached
+
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO expenses (date, category, amount, description, user_id) VALUES ('2025-02-01', 'Rent', 5, '', 1)")
+    conn.commit()
+    conn.close()
+    _assert_matches(1)
+    assert len(database.fetch_expenses(1)) == 2
+
+def test_cache_sees_writes_from_other_processes(db):
+    database.start_writer()
+    database.create_user("user1", "pw")
+    rnd = random.Random(99)
+    ctx = multiprocessing.get_context("spawn")
+    for i in range(5):
+        _random_write(rnd, 1)
+        _assert_matches(1)  # fills the cache
+        p = ctx.Process(target=_external_write, args=(db, 1, 100 + i))
+        p.start()
+        p.join()
+        assert p.exitcode == 0
+        _assert_matches(1)
+        assert any(r[3] == 100 + i for r in database.fetch_expenses(1))
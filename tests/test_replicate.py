@@ -0,0 +1,71 @@
+# test_replicate.py
+import database
+from replicate import replicate
+
+def _users(path):
+    conn = database.sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, username, password, security_question, security_answer FROM users ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+def test_replica_follows_users_and_password_resets(db, tmp_path):
+    replica = str(tmp_path / "replica.db")
+    database.create_user("alice", "pw", "Pet?", "Rex")
+    assert replicate(replica)["seeded"] == 1
+
+    database.create_user("bob", "pw2")
+    assert database.reset_password_with_answer("alice", "rex", "new-pw")
+    assert replicate(replica) == {"seeded": 0, "applied": 2, "last_seq": 3}
+    assert _users(replica) == _users(db)
+    assert all(isinstance(u[2], bytes) for u in _users(replica))
+
+    # Logins against the replica see the new password
+    database.DB_NAME = replica
+    try:
+        assert database.check_login("alice", "new-pw") == 1
+        assert database.check_login("bob", "pw2") == 2
+    finally:
+        database.DB_NAME = db
+
+def _log_size(path):
+    conn = database.sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_compaction_without_replicas_empties_the_log(db, tmp_path):
+    from replicate import compact_change_log, forget_replica
+    database.create_user("alice", "pw")
+    for i in range(5):
+        database.add_expense_to_db("2025-01-01", "Food", i, "x", 1)
+    assert compact_change_log() == 6
+    assert _log_size(db) == 0
+
+    # A replica registered afterwards seeds from a snapshot and then follows the log
+    replica = str(tmp_path / "replica.db")
+    assert replicate(replica)["seeded"] == 1
+    database.add_expense_to_db("2025-01-02", "Food", 9, "y", 1)
+    database.add_expense_to_db("2025-01-03", "Food", 9, "z", 1)
+    assert compact_change_log() == 0
+    assert replicate(replica)["applied"] == 2
+    assert compact_change_log() == 2
+
+    # Once the replica is forgotten nothing holds the log back; coming back means a reseed
+    database.add_expense_to_db("2025-01-04", "Food", 9, "w", 1)
+    assert forget_replica(replica)
+    assert compact_change_log() == 1
+    assert replicate(replica)["seeded"] == 1
+
+def test_maintenance_compacts_tenant_change_logs(tmp_path):
+    from maintenance import Maintenance, _drive
+    assert database.init_db(str(tmp_path / "dir.db"), str(tmp_path / "tenants"))
+    database.create_user("alice", "pw")
+    for i in range(3):
+        database.add_expense_to_db("2025-01-01", "Food", i, "x", 1)
+    tenant = database.db_path_for(1)
+    assert _log_size(tenant) == 3
+    m = Maintenance(tenant)
+    assert _drive(m, 10)
+    assert m.report["log_entries_removed"] == 3 and _log_size(tenant) == 0
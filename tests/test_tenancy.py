@@ -0,0 +1,111 @@
+# test_tenancy.py
+import os
+import subprocess
+import sys
+
+import database
+from archive import archive_path, archived_years, fetch_all_expenses
+from cashflow import cash_flow
+from tenancy import split_shared_db
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+def _tenant_db(tmp_path):
+    directory, tenants = str(tmp_path / "dir.db"), str(tmp_path / "tenants")
+    assert database.init_db(directory, tenants)
+    return directory, tenants
+
+def test_reads_do_not_create_tenant_files(tmp_path):
+    directory, tenants = _tenant_db(tmp_path)
+    assert database.fetch_expenses(999) == []
+    assert database.get_monthly_budget(999) is None
+    assert cash_flow(999) == []
+    assert os.listdir(tenants) == []
+    assert database.tenant_path(999) is None
+
+    assert database.add_expense_to_db("2025-01-01", "Food", 5, "", 999)
+    assert os.path.exists(database.tenant_path(999))
+    assert len(database.fetch_expenses(999)) == 1
+
+def test_create_user_creates_tenant_file(tmp_path):
+    _tenant_db(tmp_path)
+    assert database.create_user("alice", "pw")
+    user_id = database.check_login("alice", "pw")
+    assert os.path.exists(database.tenant_path(user_id))
+
+def test_archive_command_archives_tenant_files(tmp_path):
+    directory, tenants = _tenant_db(tmp_path)
+    for user_id in (1, 2):
+        database.add_expense_to_db("2020-06-01", "Food", 10 * user_id, "old", user_id)
+        database.add_expense_to_db("2025-06-01", "Food", 1, "new", user_id)
+    expected = {u: fetch_all_expenses(u) for u in (1, 2)}
+
+    cli = [sys.executable, MAIN, "--db", directory, "--tenant-dir", tenants]
+    subprocess.run(cli + ["archive", "2020", "--user", "1"], check=True, capture_output=True)
+    assert archived_years(database.tenant_path(1)) == [2020]
+    assert archived_years(database.tenant_path(2)) == []
+    subprocess.run(cli + ["archive", "2020"], check=True, capture_output=True)
+
+    # What the GUI reads: each user's own file and its archives
+    database.init_db(directory, tenants)
+    for user_id in (1, 2):
+        path = database.tenant_path(user_id)
+        assert archived_years(path) == [2020]
+        assert os.path.exists(archive_path(2020, path))
+        assert [r[1] for r in database.fetch_expenses(user_id)] == ["2025-06-01"]
+        assert fetch_all_expenses(user_id) == expected[user_id]
+        assert cash_flow(user_id)[0][:3] == ("2020-06", 0.0, 10.0 * user_id)
+    assert archive_path(2020, database.tenant_path(1)) != archive_path(2020, database.tenant_path(2))
+
+def test_split_shared_db_keeps_every_users_data(tmp_path):
+    shared = str(tmp_path / "shared.db")
+    assert database.init_db(shared)
+    for name in ("a", "b"):
+        assert database.create_user(name, "pw")
+    for user_id in (1, 2):
+        database.add_expense_to_db("2020-03-01", "Rent", 100 * user_id, "", user_id)
+        database.add_expense_to_db("2025-03-01", "Food", user_id, "", user_id)
+        database.set_budget(user_id, 500 * user_id)
+    from archive import archive_year
+    archive_year(2020)
+    expected = {u: (fetch_all_expenses(u), cash_flow(u), database.get_monthly_budget(u)) for u in (1, 2)}
+
+    directory, tenants = str(tmp_path / "dir.db"), str(tmp_path / "tenants")
+    split_shared_db(directory, tenants, shared)
+    assert database.init_db(directory, tenants)
+    assert database.check_login("b", "pw") == 2
+    for user_id in (1, 2):
+        assert (fetch_all_expenses(user_id), cash_flow(user_id), database.get_monthly_budget(user_id)) == expected[user_id]
+
+def test_restore_refuses_a_shared_backup_in_a_tenant_file(tmp_path):
+    from analytics import monthly_category_totals
+    shared = str(tmp_path / "shared.db")
+    assert database.init_db(shared)
+    for user_id in (1, 2):
+        database.add_expense_to_db("2025-01-05", "Food", 7, "", user_id)
+    backup = str(tmp_path / "shared_backup.db")
+    assert database.backup_db(backup)
+
+    directory, tenants = _tenant_db(tmp_path)
+    for user_id in (1, 2):
+        database.add_expense_to_db("2025-01-05", "Food", 7, "", user_id)
+    own = str(tmp_path / "user1_backup.db")
+    assert database.backup_db(own, 1)
+    database.add_expense_to_db("2025-01-06", "Food", 1, "after backup", 1)
+
+    assert not database.restore_db(backup, 1)
+    totals = monthly_category_totals().set_index("user_id")["total"]
+    assert (totals[1], totals[2]) == (8.0, 7.0)
+    assert database.restore_db(own, 1)
+    assert [r[4] for r in database.fetch_expenses(1)] == [""]
+
+def test_maintain_and_compact_log_cover_every_tenant_file(tmp_path):
+    directory, tenants = _tenant_db(tmp_path)
+    for user_id in (1, 2):
+        database.add_expense_to_db("2025-01-05", "Food", 7, "", user_id)
+    cli = [sys.executable, MAIN, "--db", directory, "--tenant-dir", tenants]
+    out = subprocess.run(cli + ["compact-log"], check=True, capture_output=True, text=True).stdout
+    assert out.count("Removed 1 change log entries in") == 2
+    subprocess.run(cli + ["maintain"], check=True, capture_output=True)
+    from maintenance import last_run
+    assert all(last_run(p) is not None for p in [directory] + database.data_paths())